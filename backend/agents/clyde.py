@@ -79,6 +79,9 @@ class ClydeChatManager:
 
         # Steps accumulated during the current response (tool_use, agent activity)
         self._response_steps: list[dict[str, Any]] = []
+        # Subagents (other than Clyde) that stopped during the current
+        # response — kept alongside the steps so callers don't rescan them
+        self._delegated_agents: set[str] = set()
 
         # Running session cost from the SDK (cumulative); used to derive per-message cost.
         self._prev_session_cost: float = 0.0
@@ -537,12 +540,15 @@ class ClydeChatManager:
 
         # Track as a response step
         agent_type = hook_input.get("agent_type", "")
+        stopped_label = agent_type or hook_input.get("agent_id", "unknown")
         self._response_steps.append({
             "type": "agent_stopped",
-            "label": agent_type or hook_input.get("agent_id", "unknown"),
+            "label": stopped_label,
             "detail": "Team member" if is_team_member else "Subagent",
             "timestamp": datetime.now(timezone.utc).isoformat(),
         })
+        if stopped_label and stopped_label.lower() != "clyde":
+            self._delegated_agents.add(stopped_label)
 
         agent_id = hook_input.get("agent_id", "")
         agent_label = agent_type or agent_id
@@ -745,6 +751,7 @@ class ClydeChatManager:
 
         # Reset steps for this response
         self._response_steps = []
+        self._delegated_agents = set()
 
         # Prompt caching: prepend volatile context (timestamp, context summary)
         # to the first user message only, keeping the system prompt cache-stable
@@ -1,19 +1,25 @@
 import asyncio
-import base64
+import codecs
+import functools
 import logging
 import mimetypes
 import os
-import json
+import re
+import stat
+import tempfile
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from urllib.parse import quote
 
+import orjson
 from dotenv import load_dotenv
 from pathlib import Path
 import shutil
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 
 # Configure logging
 logging.basicConfig(
@@ -24,8 +30,11 @@ logger = logging.getLogger(__name__)
 
 from agents.clyde import ClydeChatManager
 from services.supabase_client import (
+    warm_supabase,
+    close_supabase,
     create_session,
     save_message,
+    update_message_embedding,
     get_session_messages,
     get_sessions,
     get_session,
@@ -50,7 +59,7 @@ from services.registry import load_registry, save_registry
 from services.settings import load_settings, update_settings
 from services.scheduler import TaskScheduler
 from services.file_watcher import FileWatcherService
-from services.performance_logger import PerformanceLogger
+from services.performance_logger import PerformanceLogger, close_log_files
 from services.proactive_engine import ProactiveEngine
 from services.sleep_prevention import SleepPrevention
 
@@ -92,18 +101,29 @@ _connected_clients: set[WebSocket] = set()
 _sleep_prevention: SleepPrevention | None = None
 
 
+async def _send_orjson(ws: WebSocket, payload: dict) -> None:
+    """Send a JSON payload, serialised with orjson rather than stdlib json.
+
+    Sent as a text frame (not bytes) because the frontend JSON.parses
+    event.data directly.
+    """
+    await ws.send_text(orjson.dumps(payload).decode())
+
+
 async def _broadcast_insights(insights: list[dict]):
     """Broadcast new proactive insights to all connected WebSocket clients."""
     if not insights:
         return
+    # Encode once, send the same text to every client
+    frames = [
+        orjson.dumps({"type": "proactive_insight", "data": insight}).decode()
+        for insight in insights
+    ]
     stale: list[WebSocket] = []
     for client in _connected_clients:
-        for insight in insights:
+        for frame in frames:
             try:
-                await client.send_json({
-                    "type": "proactive_insight",
-                    "data": insight,
-                })
+                await client.send_text(frame)
             except Exception:
                 stale.append(client)
                 break
@@ -113,17 +133,18 @@ async def _broadcast_insights(insights: list[dict]):
 
 async def broadcast_session_created(session: dict):
     """Broadcast a new session to all connected clients (for scheduler/trigger sessions)."""
+    frame = orjson.dumps({
+        "type": "background_session_created",
+        "data": {
+            "session_id": session["id"],
+            "title": session.get("title", "New Chat"),
+            "created_at": session.get("created_at", ""),
+        },
+    }).decode()
     stale: list[WebSocket] = []
     for client in _connected_clients:
         try:
-            await client.send_json({
-                "type": "background_session_created",
-                "data": {
-                    "session_id": session["id"],
-                    "title": session.get("title", "New Chat"),
-                    "created_at": session.get("created_at", ""),
-                },
-            })
+            await client.send_text(frame)
         except Exception:
             stale.append(client)
     for s in stale:
@@ -140,6 +161,7 @@ async def _run_proactive_analysis():
             logger.info("[Proactive] Proactive mode disabled — skipping")
             return
         new_insights = await _proactive_engine.run_analysis()
+        _invalidate_pending_insights()
         await _broadcast_insights(new_insights)
     except Exception as e:
         logger.error(f"[Proactive] Scheduled analysis failed: {e}")
@@ -150,21 +172,21 @@ async def lifespan(app: FastAPI):
     global _scheduler, _file_watcher, _performance_logger, _proactive_engine, _sleep_prevention
 
     # Startup
-    print(f"[Clyde Backend] Working directory: {WORKING_DIR}")
+    logger.info(f"[Clyde Backend] Working directory: {WORKING_DIR}")
 
     # Phase 4C: Start task scheduler
     _scheduler = TaskScheduler(WORKING_DIR)
     _scheduler.start()
-    print(f"[Clyde Backend] Scheduler started")
+    logger.info("[Clyde Backend] Scheduler started")
 
     # Phase 4D: Start file watcher
     _file_watcher = FileWatcherService(WORKING_DIR)
     await _file_watcher.start()
-    print(f"[Clyde Backend] File watcher started")
+    logger.info("[Clyde Backend] File watcher started")
 
     # Phase 5A: Performance logger
     _performance_logger = PerformanceLogger(WORKING_DIR)
-    print(f"[Clyde Backend] Performance logger initialised")
+    logger.info("[Clyde Backend] Performance logger initialised")
 
     # Phase 6: Proactive engine + scheduled job
     _proactive_engine = ProactiveEngine(WORKING_DIR)
@@ -181,21 +203,28 @@ async def lifespan(app: FastAPI):
             id="proactive-insights",
             replace_existing=True,
         )
-    print(f"[Clyde Backend] Proactive engine initialised (interval: {interval_hours}h)")
+    logger.info(f"[Clyde Backend] Proactive engine initialised (interval: {interval_hours}h)")
 
     # Sleep prevention (start if enabled in settings)
     _sleep_prevention = SleepPrevention()
     if settings.get("prevent_sleep_enabled", False):
         if _sleep_prevention.start():
-            print(f"[Clyde Backend] Sleep prevention active ({_sleep_prevention.platform_name}: {_sleep_prevention.method_description})")
+            logger.info(f"[Clyde Backend] Sleep prevention active ({_sleep_prevention.platform_name}: {_sleep_prevention.method_description})")
         else:
-            print(f"[Clyde Backend] Sleep prevention failed to start on {_sleep_prevention.platform_name}")
+            logger.warning(f"[Clyde Backend] Sleep prevention failed to start on {_sleep_prevention.platform_name}")
     else:
-        print("[Clyde Backend] Sleep prevention disabled")
+        logger.info("[Clyde Backend] Sleep prevention disabled")
 
     # Ensure uploads directory exists
     os.makedirs(os.path.join(WORKING_DIR, "uploads"), exist_ok=True)
 
+    # Open the Supabase connection pool up front (reused for the process lifetime)
+    try:
+        await asyncio.to_thread(warm_supabase)
+        logger.info("[Clyde Backend] Supabase connection ready")
+    except Exception as e:
+        logger.warning(f"[Clyde Backend] Supabase warm-up failed: {e}")
+
     yield
 
     # Shutdown
@@ -204,8 +233,10 @@ async def lifespan(app: FastAPI):
     if _file_watcher:
         await _file_watcher.stop()
     if _scheduler:
-        _scheduler.stop()
-    print("[Clyde Backend] Shutting down")
+        await _scheduler.stop()
+    close_supabase()
+    close_log_files()
+    logger.info("[Clyde Backend] Shutting down")
 
 
 app = FastAPI(title="Project Clyde Backend", lifespan=lifespan)
@@ -590,13 +621,37 @@ async def record_performance_feedback(body: dict):
 
 # --- Proactive Insights (Phase 6) ---
 
+# Short-lived shared result for the pending-insights query so concurrent
+# dashboard pollers coalesce onto a single Supabase round-trip.
+_PENDING_INSIGHTS_TTL = 2.0  # seconds
+_pending_cache: tuple[float, list[dict]] | None = None
+_pending_lock = asyncio.Lock()
+
+
+async def _cached_pending_insights() -> list[dict]:
+    """Return pending insights, sharing one query per TTL window."""
+    global _pending_cache
+    async with _pending_lock:
+        now = time.monotonic()
+        if _pending_cache is not None and now - _pending_cache[0] < _PENDING_INSIGHTS_TTL:
+            return _pending_cache[1]
+        insights = await get_pending_insights(limit=20)
+        _pending_cache = (time.monotonic(), insights)
+        return insights
+
+
+def _invalidate_pending_insights() -> None:
+    """Drop the cached pending list after insights are added or changed."""
+    global _pending_cache
+    _pending_cache = None
+
 
 @app.get("/api/insights")
 async def list_insights(status: str | None = None):
     """List all insights, optionally filtered by status."""
     try:
         if status == "pending":
-            insights = await get_pending_insights(limit=20)
+            insights = await _cached_pending_insights()
         else:
             insights = await get_all_insights(limit=50)
         return {"insights": insights}
@@ -609,7 +664,7 @@ async def list_insights(status: str | None = None):
 async def list_pending_insights():
     """Get pending insights for frontend polling."""
     try:
-        insights = await get_pending_insights(limit=20)
+        insights = await _cached_pending_insights()
         return {"insights": insights}
     except Exception as e:
         logger.error(f"[API] Failed to list pending insights: {e}")
@@ -625,6 +680,7 @@ async def patch_insight(insight_id: str, body: dict):
             return {"error": "status must be dismissed, snoozed, or acted_upon"}
         snoozed_until = body.get("snoozed_until")
         result = await update_insight_status(insight_id, status, snoozed_until)
+        _invalidate_pending_insights()
         return {"insight": result}
     except Exception as e:
         logger.error(f"[API] Failed to update insight: {e}")
@@ -636,6 +692,7 @@ async def remove_insight(insight_id: str):
     """Permanently delete an insight."""
     try:
         deleted = await delete_insight(insight_id)
+        _invalidate_pending_insights()
         if not deleted:
             return {"error": "Insight not found"}
         return {"deleted": True, "id": insight_id}
@@ -665,6 +722,7 @@ async def trigger_proactive_analysis():
         if not _proactive_engine:
             return {"error": "Proactive engine not available"}
         new_insights = await _proactive_engine.run_analysis()
+        _invalidate_pending_insights()
         # Broadcast to connected clients
         await _broadcast_insights(new_insights)
         return {
@@ -679,6 +737,32 @@ async def trigger_proactive_analysis():
 
 # --- System Prompt Management (Phase 5B) ---
 
+# Last content written per prompt file, keyed by absolute path and stamped with
+# the file's mtime so edits made elsewhere (agent tools, self-improvement)
+# are never masked by a stale entry.
+_prompt_content_cache: dict[str, tuple[int, str]] = {}
+
+
+def _read_prompt_file(abs_path: str) -> str:
+    """Return a prompt file's content, skipping the disk read on a cache hit."""
+    try:
+        mtime_ns = os.stat(abs_path).st_mtime_ns
+    except FileNotFoundError:
+        _prompt_content_cache.pop(abs_path, None)
+        return ""
+    cached = _prompt_content_cache.get(abs_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    with open(abs_path, "r") as f:
+        return f.read()
+
+
+def _write_prompt_file(abs_path: str, content: str) -> None:
+    """Write a prompt file and remember its content for the next edit."""
+    with open(abs_path, "w") as f:
+        f.write(content)
+    _prompt_content_cache[abs_path] = (os.stat(abs_path).st_mtime_ns, content)
+
 
 @app.get("/api/prompts/{agent_id}/history")
 async def get_prompt_history_endpoint(agent_id: str):
@@ -762,15 +846,11 @@ async def update_prompt(agent_id: str, body: dict):
             prompt_path.replace("/working/", "", 1),
         )
 
-        # Read old version
-        old_content = ""
-        if os.path.exists(abs_path):
-            with open(abs_path, "r") as f:
-                old_content = f.read()
+        # Read old version (served from the last-written cache when unchanged)
+        old_content = _read_prompt_file(abs_path)
 
         # Write new version
-        with open(abs_path, "w") as f:
-            f.write(new_content)
+        _write_prompt_file(abs_path, new_content)
 
         # Log to Supabase history
         history_entry = await save_prompt_change(
@@ -822,14 +902,10 @@ async def rollback_prompt(agent_id: str, version_id: str):
         )
 
         # Read current version
-        old_content = ""
-        if os.path.exists(abs_path):
-            with open(abs_path, "r") as f:
-                old_content = f.read()
+        old_content = _read_prompt_file(abs_path)
 
         # Write the rolled-back version
-        with open(abs_path, "w") as f:
-            f.write(target_content)
+        _write_prompt_file(abs_path, target_content)
 
         # Log the rollback to history
         history_entry = await save_prompt_change(
@@ -930,24 +1006,40 @@ _ENV_WHITELIST = {
 
 _ENV_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", ".env.local")
 
+# KEY=value assignment lines (comments and blank lines never match)
+_ENV_ASSIGNMENT_RE = re.compile(r"^[ \t]*([A-Z_][A-Z0-9_]*)[ \t]*=.*$", re.M)
+
+# Parsed .env.local keyed by (st_mtime_ns, st_size); invalidated on write
+_env_cache: tuple[tuple[int, int], dict[str, str]] | None = None
+
 
 @app.get("/api/env-vars")
 async def get_env_vars():
     """Read whitelisted environment variables from .env.local."""
+    global _env_cache
     try:
+        try:
+            st = os.stat(_ENV_FILE_PATH)
+        except FileNotFoundError:
+            return {"vars": {k: "" for k in _ENV_WHITELIST}}
+
+        key_sig = (st.st_mtime_ns, st.st_size)
+        if _env_cache is not None and _env_cache[0] == key_sig:
+            return {"vars": dict(_env_cache[1])}
+
         env_vars: dict[str, str] = {k: "" for k in _ENV_WHITELIST}
-        if os.path.exists(_ENV_FILE_PATH):
-            with open(_ENV_FILE_PATH, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    if "=" in line:
-                        key, _, value = line.partition("=")
-                        key = key.strip()
-                        if key in _ENV_WHITELIST:
-                            env_vars[key] = value.strip()
-        return {"vars": env_vars}
+        with open(_ENV_FILE_PATH, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if "=" in line:
+                    key, _, value = line.partition("=")
+                    key = key.strip()
+                    if key in _ENV_WHITELIST:
+                        env_vars[key] = value.strip()
+        _env_cache = (key_sig, env_vars)
+        return {"vars": dict(env_vars)}
     except Exception as e:
         logger.error(f"[API] Get env vars failed: {e}")
         return {"error": str(e)}
@@ -956,6 +1048,7 @@ async def get_env_vars():
 @app.patch("/api/env-vars")
 async def update_env_vars(body: dict):
     """Update whitelisted environment variables in .env.local."""
+    global _env_cache
     try:
         # Filter to only whitelisted keys
         updates = {k: v for k, v in body.items() if k in _ENV_WHITELIST}
@@ -963,33 +1056,43 @@ async def update_env_vars(body: dict):
             return {"error": "No valid environment variables provided"}
 
         # Read current file
-        lines: list[str] = []
+        data = ""
         if os.path.exists(_ENV_FILE_PATH):
             with open(_ENV_FILE_PATH, "r") as f:
-                lines = f.readlines()
+                data = f.read()
 
         # Track which keys we've updated in-place
         updated_keys: set[str] = set()
 
-        new_lines: list[str] = []
-        for line in lines:
-            stripped = line.strip()
-            if stripped and not stripped.startswith("#") and "=" in stripped:
-                key = stripped.partition("=")[0].strip()
-                if key in updates:
-                    new_lines.append(f"{key}={updates[key]}\n")
-                    updated_keys.add(key)
-                    continue
-            new_lines.append(line)
+        def _replace(m: re.Match) -> str:
+            key = m.group(1)
+            if key not in updates:
+                return m.group(0)
+            updated_keys.add(key)
+            return f"{key}={updates[key]}"
+
+        data = _ENV_ASSIGNMENT_RE.sub(_replace, data)
 
         # Append any keys that weren't found in the file
         for key, value in updates.items():
             if key not in updated_keys:
-                new_lines.append(f"\n{key}={value}\n")
+                data += f"\n{key}={value}\n"
 
-        # Write back
-        with open(_ENV_FILE_PATH, "w") as f:
-            f.writelines(new_lines)
+        # Write back atomically (tmp + rename)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(_ENV_FILE_PATH), suffix=".env"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, _ENV_FILE_PATH)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        _env_cache = None
 
         # Update os.environ so the running backend picks up changes
         for key, value in updates.items():
@@ -1025,72 +1128,78 @@ async def update_agent_rest(registry_id: str, body: dict):
 # --- Export/Import (Phase 5E) ---
 
 
-@app.get("/api/system/export")
-async def export_system():
-    """Export the full system state as a JSON bundle."""
+def _read_json_file(path: str) -> dict:
+    """Parse a JSON file, or return {} if it doesn't exist."""
     try:
-        bundle: dict = {
-            "export_version": "1.0",
-            "exported_at": datetime.now(timezone.utc).isoformat(),
-        }
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+
+def _export_error_line(section: str, error: Exception) -> bytes:
+    return orjson.dumps(
+        {"section": "error", "failed_section": section, "error": str(error)}
+    ) + b"\n"
+
+
+def _export_lines():
+    """Yield the export bundle as NDJSON, one section or file per line.
+
+    Runs in Starlette's threadpool, so memory stays bounded by the largest
+    single file and bytes hit the socket as the disk reads progress. The
+    status line is already sent, so a failing section ends the stream with
+    an error line instead of a partial bundle that looks complete.
+    """
+    yield orjson.dumps({
+        "section": "meta",
+        "export_version": "1.0",
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }) + b"\n"
+
+    try:
+        registry = load_registry(WORKING_DIR)
+    except Exception:
+        registry = {}
+    yield orjson.dumps({"section": "registry", "data": registry}) + b"\n"
 
-        # Registry
+    for section in ("schedules", "triggers"):
         try:
-            registry = load_registry(WORKING_DIR)
-            bundle["registry"] = registry
-        except Exception:
-            bundle["registry"] = {}
+            data = _read_json_file(os.path.join(WORKING_DIR, f"{section}.json"))
+        except Exception as e:
+            logger.error(f"[API] Export of {section} failed: {e}")
+            yield _export_error_line(section, e)
+            return
+        yield orjson.dumps({"section": section, "data": data}) + b"\n"
 
-        # Schedules
-        schedules_path = os.path.join(WORKING_DIR, "schedules.json")
-        if os.path.exists(schedules_path):
-            with open(schedules_path, "r") as f:
-                bundle["schedules"] = json.load(f)
-        else:
-            bundle["schedules"] = {}
+    for section in ("prompts", "skills", "memory"):
+        try:
+            with os.scandir(os.path.join(WORKING_DIR, section)) as it:
+                for entry in it:
+                    if not entry.name.endswith(".md"):
+                        continue
+                    with open(entry.path, "r") as f:
+                        content = f.read()
+                    yield orjson.dumps(
+                        {"section": section, "name": entry.name, "content": content}
+                    ) + b"\n"
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        except Exception as e:
+            logger.error(f"[API] Export of {section} failed: {e}")
+            yield _export_error_line(section, e)
+            return
+
+
+@app.get("/api/system/export")
+async def export_system():
+    """Export the full system state as an NDJSON stream (one section or file per line)."""
+    return StreamingResponse(_export_lines(), media_type="application/x-ndjson")
 
-        # Triggers
-        triggers_path = os.path.join(WORKING_DIR, "triggers.json")
-        if os.path.exists(triggers_path):
-            with open(triggers_path, "r") as f:
-                bundle["triggers"] = json.load(f)
-        else:
-            bundle["triggers"] = {}
-
-        # Prompts (all .md in working/prompts/)
-        prompts = {}
-        prompts_dir = os.path.join(WORKING_DIR, "prompts")
-        if os.path.isdir(prompts_dir):
-            for fname in os.listdir(prompts_dir):
-                if fname.endswith(".md"):
-                    with open(os.path.join(prompts_dir, fname), "r") as f:
-                        prompts[fname] = f.read()
-        bundle["prompts"] = prompts
-
-        # Skills
-        skills = {}
-        skills_dir = os.path.join(WORKING_DIR, "skills")
-        if os.path.isdir(skills_dir):
-            for fname in os.listdir(skills_dir):
-                if fname.endswith(".md"):
-                    with open(os.path.join(skills_dir, fname), "r") as f:
-                        skills[fname] = f.read()
-        bundle["skills"] = skills
-
-        # Memory
-        memory = {}
-        memory_dir = os.path.join(WORKING_DIR, "memory")
-        if os.path.isdir(memory_dir):
-            for fname in os.listdir(memory_dir):
-                if fname.endswith(".md"):
-                    with open(os.path.join(memory_dir, fname), "r") as f:
-                        memory[fname] = f.read()
-        bundle["memory"] = memory
-
-        return bundle
-    except Exception as e:
-        logger.error(f"[API] Export failed: {e}")
-        return {"error": str(e)}
+
+def _write_bytes_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
 
 
 @app.post("/api/system/import")
@@ -1107,65 +1216,56 @@ async def import_system(body: dict):
         )
         os.makedirs(backup_dir, exist_ok=True)
 
-        # Backup current files
+        # Backup current files — the copies are independent, so run them
+        # concurrently in worker threads instead of one by one on the loop
+        backup_copies: list[tuple[str, str]] = []
         for subdir in ["prompts", "skills", "memory"]:
             src_dir = os.path.join(WORKING_DIR, subdir)
             dst_dir = os.path.join(backup_dir, subdir)
             if os.path.isdir(src_dir):
                 os.makedirs(dst_dir, exist_ok=True)
-                for fname in os.listdir(src_dir):
-                    src = os.path.join(src_dir, fname)
-                    if os.path.isfile(src):
-                        with open(src, "r") as f:
-                            content = f.read()
-                        with open(os.path.join(dst_dir, fname), "w") as f:
-                            f.write(content)
+                with os.scandir(src_dir) as it:
+                    backup_copies.extend(
+                        (entry.path, os.path.join(dst_dir, entry.name))
+                        for entry in it
+                        if entry.is_file()
+                    )
 
         for fname in ["registry.json", "schedules.json", "triggers.json"]:
             src = os.path.join(WORKING_DIR, fname)
             if os.path.exists(src):
-                with open(src, "r") as f:
-                    content = f.read()
-                with open(os.path.join(backup_dir, fname), "w") as f:
-                    f.write(content)
+                backup_copies.append((src, os.path.join(backup_dir, fname)))
+
+        await asyncio.gather(
+            *(asyncio.to_thread(shutil.copy2, src, dst) for src, dst in backup_copies)
+        )
 
         # Import registry
         if "registry" in body and body["registry"]:
             save_registry(WORKING_DIR, body["registry"])
 
-        # Import schedules
-        if "schedules" in body:
-            with open(os.path.join(WORKING_DIR, "schedules.json"), "w") as f:
-                json.dump(body["schedules"], f, indent=2)
-
-        # Import triggers
-        if "triggers" in body:
-            with open(os.path.join(WORKING_DIR, "triggers.json"), "w") as f:
-                json.dump(body["triggers"], f, indent=2)
-
-        # Import prompts
-        if "prompts" in body:
-            prompts_dir = os.path.join(WORKING_DIR, "prompts")
-            os.makedirs(prompts_dir, exist_ok=True)
-            for fname, content in body["prompts"].items():
-                with open(os.path.join(prompts_dir, fname), "w") as f:
-                    f.write(content)
-
-        # Import skills
-        if "skills" in body:
-            skills_dir = os.path.join(WORKING_DIR, "skills")
-            os.makedirs(skills_dir, exist_ok=True)
-            for fname, content in body["skills"].items():
-                with open(os.path.join(skills_dir, fname), "w") as f:
-                    f.write(content)
-
-        # Import memory
-        if "memory" in body:
-            memory_dir = os.path.join(WORKING_DIR, "memory")
-            os.makedirs(memory_dir, exist_ok=True)
-            for fname, content in body["memory"].items():
-                with open(os.path.join(memory_dir, fname), "w") as f:
-                    f.write(content)
+        # Schedules, triggers, prompts, skills and memory — collect every
+        # (path, bytes) write, then fan them out to worker threads
+        writes: list[tuple[str, bytes]] = []
+        for section in ("schedules", "triggers"):
+            if section in body:
+                writes.append((
+                    os.path.join(WORKING_DIR, f"{section}.json"),
+                    orjson.dumps(body[section], option=orjson.OPT_INDENT_2),
+                ))
+
+        for section in ("prompts", "skills", "memory"):
+            if section in body:
+                section_dir = os.path.join(WORKING_DIR, section)
+                os.makedirs(section_dir, exist_ok=True)
+                writes.extend(
+                    (os.path.join(section_dir, fname), content.encode("utf-8"))
+                    for fname, content in body[section].items()
+                )
+
+        await asyncio.gather(
+            *(asyncio.to_thread(_write_bytes_file, path, data) for path, data in writes)
+        )
 
         return {"success": True, "backup_dir": backup_dir}
     except Exception as e:
@@ -1176,6 +1276,15 @@ async def import_system(body: dict):
 # ─── File Management API ───────────────────────────────────────────
 
 
+def _utc_isoformat(mtime_ns: int) -> str:
+    """Format an st_mtime_ns as datetime.isoformat() would for UTC, without
+    building a tz-aware datetime per directory entry."""
+    secs, ns = divmod(mtime_ns, 1_000_000_000)
+    base = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(secs))
+    us = ns // 1000
+    return f"{base}.{us:06d}+00:00" if us else f"{base}+00:00"
+
+
 @app.get("/api/files")
 async def list_files(path: str = ""):
     """List contents of a directory within the working dir."""
@@ -1184,20 +1293,24 @@ async def list_files(path: str = ""):
         if not target.is_dir():
             return {"error": "Not a directory", "items": []}
 
+        # os.scandir keeps the dirent type, so is_dir()/is_file() don't
+        # cost an extra stat per entry the way Path.iterdir() does
+        with os.scandir(target) as it:
+            rows = [
+                (not e.is_dir(), e.name.lower(), e.name, e)
+                for e in it
+                if not e.name.startswith(".")  # Skip hidden files
+            ]
+        rows.sort()
+
         items = []
-        for entry in sorted(
-            target.iterdir(), key=lambda e: (not e.is_dir(), e.name.lower())
-        ):
-            if entry.name.startswith("."):
-                continue  # Skip hidden files
-            stat = entry.stat()
+        for *_, entry in rows:
+            st = entry.stat()
             items.append({
                 "name": entry.name,
                 "type": "folder" if entry.is_dir() else "file",
-                "size": stat.st_size if entry.is_file() else None,
-                "modified_at": datetime.fromtimestamp(
-                    stat.st_mtime, tz=timezone.utc
-                ).isoformat(),
+                "size": st.st_size if entry.is_file() else None,
+                "modified_at": _utc_isoformat(st.st_mtime_ns),
             })
         return {"items": items, "path": path}
     except ValueError as e:
@@ -1226,6 +1339,13 @@ async def create_directory(body: dict):
         return {"error": str(e)}
 
 
+def _copy_upload(file: UploadFile, dest: Path) -> None:
+    """Stream an upload's spooled temp file to disk in 1MB chunks."""
+    file.file.seek(0)
+    with open(dest, "wb") as f:
+        shutil.copyfileobj(file.file, f, 1024 * 1024)
+
+
 @app.post("/api/files/upload")
 async def upload_files(
     files: list[UploadFile] = File(...),
@@ -1244,9 +1364,7 @@ async def upload_files(
             file_path = _safe_resolve(
                 os.path.join(path, file.filename) if path else file.filename
             )
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            await asyncio.to_thread(_copy_upload, file, file_path)
             uploaded.append(file.filename)
 
         return {"success": True, "uploaded": uploaded}
@@ -1276,8 +1394,27 @@ async def download_file(path: str):
         return {"error": str(e)}
 
 
+@app.get("/api/files/raw")
+async def raw_file(path: str):
+    """Serve a file inline with its guessed MIME type (image/PDF previews)."""
+    try:
+        target = _safe_resolve(path)
+        if not target.is_file():
+            return {"error": "File not found"}
+        mime, _ = mimetypes.guess_type(str(target))
+        return FileResponse(
+            path=str(target),
+            media_type=mime or "application/octet-stream",
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        logger.error(f"[API] Raw file failed: {e}")
+        return {"error": str(e)}
+
+
 # MIME types treated as editable text even though they don't start with "text/"
-_TEXT_MIME_EXTRAS = {
+_TEXT_MIME_EXTRAS = frozenset({
     "application/json",
     "application/javascript",
     "application/xml",
@@ -1288,31 +1425,89 @@ _TEXT_MIME_EXTRAS = {
     "application/x-python",
     "application/sql",
     "application/graphql",
-}
+})
 
 # Extensions we know are text, even if mimetypes module guesses wrong
-_TEXT_EXTENSIONS = {
+_TEXT_EXTENSIONS = frozenset({
     ".md", ".mdx", ".txt", ".json", ".jsonl", ".yaml", ".yml", ".toml",
     ".py", ".js", ".ts", ".tsx", ".jsx", ".css", ".scss", ".html", ".htm",
     ".xml", ".svg", ".sh", ".bash", ".zsh", ".fish", ".env", ".ini", ".cfg",
     ".conf", ".log", ".csv", ".sql", ".graphql", ".gql", ".rs", ".go",
     ".java", ".kt", ".swift", ".c", ".cpp", ".h", ".hpp", ".rb", ".php",
     ".lua", ".r", ".m", ".pl", ".ps1",
-}
+})
 
-_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp", ".ico"}
-_PDF_EXTENSIONS = {".pdf"}
+_IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp", ".ico"})
+_PDF_EXTENSIONS = frozenset({".pdf"})
 
 
-def _is_text_file(target: Path) -> bool:
-    """Check if a file should be treated as editable text."""
-    ext = target.suffix.lower()
+@functools.lru_cache(maxsize=256)
+def _is_text_ext(ext: str) -> bool:
+    """Check if a (lowercased) file extension is editable text. Memoized —
+    mimetypes only looks at the suffix, so the answer is fixed per extension."""
     if ext in _TEXT_EXTENSIONS:
         return True
-    mime, _ = mimetypes.guess_type(str(target))
-    if mime and (mime.startswith("text/") or mime in _TEXT_MIME_EXTRAS):
-        return True
-    return False
+    mime, _ = mimetypes.guess_type(f"file{ext}")
+    return bool(mime and (mime.startswith("text/") or mime in _TEXT_MIME_EXTRAS))
+
+
+def _is_text_file(target: Path) -> bool:
+    """Check if a file should be treated as editable text."""
+    return _is_text_ext(target.suffix.lower())
+
+
+# --- read_file_content handlers, dispatched on extension ---
+
+def _read_text_handler(target: Path, path: str, size: int, mime: str) -> dict:
+    """Text files — return raw content for editing."""
+    if size > 5 * 1024 * 1024:  # 5MB limit
+        return {"error": "File too large to edit (max 5MB)"}
+    return {
+        "content": target.read_text(encoding="utf-8", errors="replace"),
+        "path": path,
+        "name": target.name,
+        "size": size,
+        "mime_type": mime,
+        "editable": True,
+    }
+
+
+def _read_preview_handler(target: Path, path: str, size: int, mime: str) -> dict:
+    """Images and PDFs — return a preview URL; the browser streams the bytes
+    from /api/files/raw instead of us inlining a base64 copy."""
+    return {
+        "content": None,
+        "url": f"/api/files/raw?path={quote(path)}",
+        "path": path,
+        "name": target.name,
+        "size": size,
+        "mime_type": mime,
+        "editable": False,
+    }
+
+
+def _read_pdf_handler(target: Path, path: str, size: int, mime: str) -> dict:
+    return _read_preview_handler(target, path, size, "application/pdf")
+
+
+def _read_meta_handler(target: Path, path: str, size: int, mime: str) -> dict:
+    """Unsupported — return metadata only, no content."""
+    return {
+        "content": None,
+        "path": path,
+        "name": target.name,
+        "size": size,
+        "mime_type": mime,
+        "editable": False,
+    }
+
+
+# Text wins over image for extensions in both sets (.svg is editable)
+_EXT_HANDLERS = {
+    **dict.fromkeys(_IMAGE_EXTENSIONS, _read_preview_handler),
+    **dict.fromkeys(_PDF_EXTENSIONS, _read_pdf_handler),
+    **dict.fromkeys(_TEXT_EXTENSIONS, _read_text_handler),
+}
 
 
 @app.get("/api/files/read")
@@ -1323,66 +1518,12 @@ async def read_file_content(path: str):
         if not target.is_file():
             return {"error": "File not found"}
 
-        file_size = target.stat().st_size
         ext = target.suffix.lower()
+        handler = _EXT_HANDLERS.get(ext) or (
+            _read_text_handler if _is_text_ext(ext) else _read_meta_handler
+        )
         mime, _ = mimetypes.guess_type(str(target))
-        mime = mime or "application/octet-stream"
-
-        # Text files — return raw content for editing
-        if _is_text_file(target):
-            if file_size > 5 * 1024 * 1024:  # 5MB limit
-                return {"error": "File too large to edit (max 5MB)"}
-            content = target.read_text(encoding="utf-8", errors="replace")
-            return {
-                "content": content,
-                "path": path,
-                "name": target.name,
-                "size": file_size,
-                "mime_type": mime,
-                "editable": True,
-            }
-
-        # Images — return base64 data URI
-        if ext in _IMAGE_EXTENSIONS:
-            if file_size > 10 * 1024 * 1024:  # 10MB limit
-                return {"error": "Image too large to preview (max 10MB)"}
-            raw = target.read_bytes()
-            b64 = base64.b64encode(raw).decode("ascii")
-            data_uri = f"data:{mime};base64,{b64}"
-            return {
-                "content": data_uri,
-                "path": path,
-                "name": target.name,
-                "size": file_size,
-                "mime_type": mime,
-                "editable": False,
-            }
-
-        # PDFs — return base64 data URI
-        if ext in _PDF_EXTENSIONS:
-            if file_size > 10 * 1024 * 1024:  # 10MB limit
-                return {"error": "PDF too large to preview (max 10MB)"}
-            raw = target.read_bytes()
-            b64 = base64.b64encode(raw).decode("ascii")
-            data_uri = f"data:application/pdf;base64,{b64}"
-            return {
-                "content": data_uri,
-                "path": path,
-                "name": target.name,
-                "size": file_size,
-                "mime_type": "application/pdf",
-                "editable": False,
-            }
-
-        # Unsupported — return metadata only, no content
-        return {
-            "content": None,
-            "path": path,
-            "name": target.name,
-            "size": file_size,
-            "mime_type": mime,
-            "editable": False,
-        }
+        return handler(target, path, target.stat().st_size, mime or "application/octet-stream")
     except ValueError as e:
         return {"error": str(e)}
     except Exception as e:
@@ -1390,6 +1531,29 @@ async def read_file_content(path: str):
         return {"error": str(e)}
 
 
+def _atomic_write_bytes(target: Path, data: bytes) -> None:
+    """Write data to a temp file beside target, then swap it in with os.replace
+    so readers never see a half-written file. Keeps the existing file's mode."""
+    try:
+        mode = target.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 @app.put("/api/files/save")
 async def save_file_content(body: dict):
     """Save text content to a file (for the file viewer editor)."""
@@ -1411,11 +1575,12 @@ async def save_file_content(body: dict):
         # Ensure parent directory exists
         target.parent.mkdir(parents=True, exist_ok=True)
 
-        target.write_text(content, encoding="utf-8")
+        data = content.encode("utf-8")
+        _atomic_write_bytes(target, data)
         return {
             "success": True,
             "path": rel_path,
-            "size": len(content.encode("utf-8")),
+            "size": len(data),
         }
     except ValueError as e:
         return {"error": str(e)}
@@ -1441,7 +1606,10 @@ async def delete_file(body: dict):
             return {"error": "Cannot delete the working directory root"}
 
         if target.is_dir():
-            shutil.rmtree(target)
+            # rmtree already walks with scandir + dir_fd (shutil.rmtree.avoids_symlink_attacks),
+            # using dirent types rather than an lstat per entry — the cost for
+            # big trees is the syscalls themselves, so keep them off the loop
+            await asyncio.to_thread(shutil.rmtree, target)
         else:
             target.unlink()
 
@@ -1453,30 +1621,283 @@ async def delete_file(body: dict):
         return {"error": str(e)}
 
 
+def _walk_visible_files(root: str, folder: str = "", dir_sigs: list | None = None):
+    """Yield (path, name, folder) for every non-hidden file under root.
+
+    Hidden directories are pruned at the directory level, so their whole
+    subtree is skipped without being listed. Symlinked directories are not
+    descended into (matching Path.rglob). If dir_sigs is given, a
+    (dir, st_mtime_ns) pair is appended for every directory scanned.
+    """
+    if dir_sigs is not None:
+        # Stat before listing so a change mid-scan invalidates next time
+        dir_sigs.append((root, os.stat(root).st_mtime_ns))
+    with os.scandir(root) as it:
+        entries = [e for e in it if not e.name.startswith(".")]
+    for entry in entries:
+        rel = os.path.join(folder, entry.name) if folder else entry.name
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_visible_files(entry.path, rel, dir_sigs)
+        elif entry.is_file():
+            yield rel, entry.name, folder
+
+
+# File tree cache — a directory's mtime changes whenever an entry is added,
+# removed or renamed in it, so re-statting the directories from the last
+# walk is enough to know whether the flat file list is still valid.
+_tree_cache: dict = {"root": None, "sigs": (), "files": []}
+
+
+def _tree_cache_valid(root: str) -> bool:
+    if _tree_cache["root"] != root or not _tree_cache["sigs"]:
+        return False
+    try:
+        return all(os.stat(d).st_mtime_ns == m for d, m in _tree_cache["sigs"])
+    except OSError:
+        return False
+
+
 @app.get("/api/files/tree")
 async def file_tree():
     """Return a flat list of all files in the working dir for @-mention autocomplete."""
     try:
-        working = Path(WORKING_DIR).resolve()
-        files = []
-        for p in working.rglob("*"):
-            if p.is_file() and not any(
-                part.startswith(".") for part in p.relative_to(working).parts
-            ):
-                rel = str(p.relative_to(working))
-                parent = str(p.relative_to(working).parent)
-                files.append({
-                    "path": rel,
-                    "name": p.name,
-                    "folder": parent if parent != "." else "",
-                })
+        working = str(Path(WORKING_DIR).resolve())
+        if _tree_cache_valid(working):
+            return ORJSONResponse({"files": _tree_cache["files"]})
+
+        dir_sigs: list = []
+        files = [
+            {"path": rel, "name": name, "folder": folder}
+            for rel, name, folder in _walk_visible_files(working, dir_sigs=dir_sigs)
+        ]
         files.sort(key=lambda f: f["path"].lower())
-        return {"files": files}
+        _tree_cache.update(root=working, sigs=tuple(dir_sigs), files=files)
+        return ORJSONResponse({"files": files})
     except Exception as e:
         logger.error(f"[API] File tree failed: {e}")
         return {"files": [], "error": str(e)}
 
 
+# Strong references to in-flight backfill tasks so they aren't garbage
+# collected before they finish
+_backfill_tasks: set[asyncio.Task] = set()
+
+
+async def _backfill_user_embedding(
+    user_message_task: asyncio.Task, user_content: str
+) -> None:
+    """Embed a just-sent user message and store it on the saved row.
+
+    Started before the response streams, so the OpenAI round trip overlaps
+    the SDK's startup instead of queueing behind the reply.
+    """
+    embed_task = asyncio.create_task(generate_embedding(user_content))
+    try:
+        user_row = await user_message_task
+        await update_message_embedding(user_row["id"], await embed_task)
+    except Exception as e:
+        embed_task.cancel()
+        logger.warning(f"[WS] Failed to save user message embedding: {e}")
+
+
+# Serialized registry_update frame, rebuilt only when registry.json changes
+_registry_frame: tuple[tuple[int, int], str] | None = None
+
+
+def _registry_update_frame() -> tuple[tuple[int, int], str]:
+    """Return (registry.json (mtime_ns, size), serialized registry_update frame).
+
+    Reads the file directly rather than via load_registry so the signature
+    and the data come from the same open file, not a TTL-cached copy.
+    """
+    global _registry_frame
+    path = os.path.join(WORKING_DIR, "registry.json")
+    if not os.path.exists(path):
+        load_registry(WORKING_DIR)  # bootstraps from registry.default.json
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        sig = (st.st_mtime_ns, st.st_size)
+        if _registry_frame is not None and _registry_frame[0] == sig:
+            return _registry_frame
+        registry = orjson.loads(f.read())
+
+    agents = registry.get("agents", [])
+    frame = orjson.dumps({
+        "type": "registry_update",
+        "data": {
+            "agent_count": len(agents),
+            "agents": [
+                {
+                    "id": a["id"],
+                    "name": a["name"],
+                    "role": a["role"],
+                    "model": a.get("model", "sonnet"),
+                    "avatar": a.get("avatar"),
+                    "status": a.get("status", "active"),
+                    "tools": a.get("tools", []),
+                    "skills": a.get("skills", []),
+                }
+                for a in agents
+            ],
+        },
+    }).decode()
+    _registry_frame = (sig, frame)
+    return _registry_frame
+
+
+# Per-file limit for inlining @-referenced files into the agent prompt
+_MAX_INLINE_FILE_SIZE = 1_000_000  # 1MB
+# Text files between this and _MAX_INLINE_FILE_SIZE are inlined truncated
+_MAX_INLINE_BYTES = 256 * 1024
+
+
+def _build_file_ref_block(ref_path: str) -> str:
+    """Build the prompt context block for one @-referenced file.
+
+    Synchronous (blocking file I/O) — callers run it in a worker thread.
+    """
+    try:
+        target = _safe_resolve(ref_path)
+        # One stat answers both "is it a regular file" and "how big"
+        try:
+            st = os.stat(target)
+        except (FileNotFoundError, NotADirectoryError):
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return f"--- @{ref_path} ---\n[File not found]\n--- End of @{ref_path} ---"
+        file_size = st.st_size
+        ext = target.suffix.lower()
+
+        # Images: don't inline binary data — tell Claude to
+        # use its Read tool which handles images natively
+        if ext in _IMAGE_EXTENSIONS:
+            size_kb = round(file_size / 1024)
+            return (
+                f"--- @{ref_path} ---\n"
+                f"[Image file ({ext}, {size_kb}KB). "
+                f"Use the Read tool on the absolute path to view this image: "
+                f"{target}]\n"
+                f"--- End of @{ref_path} ---"
+            )
+
+        if file_size > _MAX_INLINE_FILE_SIZE:
+            size_mb = round(file_size / 1_000_000, 1)
+            return f"--- @{ref_path} ---\n[File too large to inline: {size_mb}MB. The file exists at {ref_path} in the working directory.]\n--- End of @{ref_path} ---"
+        # Try reading as text — only the first _MAX_INLINE_BYTES are useful
+        # in the prompt, so never pull more than that into memory. A 512-byte
+        # sniff settles most binaries (NUL bytes, or not UTF-8 from the
+        # start) before the rest of the window is read or decoded.
+        text = None
+        with open(target, "rb") as f:
+            head = f.read(512)
+            if b"\x00" not in head:
+                encoding = "utf-8-sig" if head.startswith(codecs.BOM_UTF8) else "utf-8"
+                # Incremental decode with final=False holds back a multi-byte
+                # character split by a read boundary instead of raising on it
+                decoder = codecs.getincrementaldecoder(encoding)()
+                try:
+                    text = decoder.decode(head)
+                    text += decoder.decode(
+                        f.read(_MAX_INLINE_BYTES - len(head)),
+                        final=file_size <= _MAX_INLINE_BYTES,
+                    )
+                except (UnicodeDecodeError, ValueError):
+                    text = None
+
+        if text is not None:
+            if file_size > _MAX_INLINE_BYTES:
+                text += (
+                    f"\n[truncated to {_MAX_INLINE_BYTES // 1024}KB of "
+                    f"{round(file_size / 1_000_000, 1)}MB]"
+                )
+            return f"--- Contents of @{ref_path} ---\n{text}\n--- End of @{ref_path} ---"
+
+        # Binary file — don't inline, just reference
+        return (
+            f"--- @{ref_path} ---\n[Binary file ({ext}) — {round(file_size/1024)}KB. "
+            f"Cannot display inline. The file exists at {target} "
+            f"and can be accessed via the Read tool.]\n--- End of @{ref_path} ---"
+        )
+    except Exception as e:
+        logger.warning(f"[WS] Failed to read referenced file {ref_path}: {e}")
+        return f"--- @{ref_path} ---\n[Error reading file: {e}]\n--- End of @{ref_path} ---"
+
+
+_SIZE_UNITS = ("B", "KB", "MB")
+
+
+def _format_size(n: int) -> str:
+    """Bytes below 1KB, else KB/MB to one decimal — unit picked by bit_length."""
+    i = min(max(0, (n.bit_length() - 1) // 10), len(_SIZE_UNITS) - 1)
+    if i == 0:
+        return f"{n} B"
+    return f"{n / (1 << (10 * i)):.1f} {_SIZE_UNITS[i]}"
+
+
+def _build_folder_listing(folder_context: str) -> str | None:
+    """Build the folder-context block for a FileBrowser "Start Chat" message,
+    or None if the folder can't be listed.
+
+    Synchronous (blocking file I/O) — callers run it in a worker thread.
+    """
+    try:
+        # Resolve (and traversal-check) once, then work on the plain string —
+        # no Path objects are built per entry below
+        folder_target = str(
+            _safe_resolve(folder_context)
+            if folder_context
+            else Path(WORKING_DIR).resolve()
+        )
+        if os.path.isdir(folder_target):
+            # DirEntry.is_dir() comes from the dirent type and stat() is
+            # cached on the entry, so each file costs at most one stat.
+            # Precomputed (dirs-first, lowercase name) keys sort with plain
+            # tuple compares; the exact name breaks case-only ties so the
+            # DirEntry itself is never compared.
+            with os.scandir(folder_target) as it:
+                rows = [
+                    (not e.is_dir(), e.name.lower(), e.name, e)
+                    for e in it
+                    if not e.name.startswith(".")
+                ]
+            rows.sort()
+            folder_items = []
+            for *_, entry in rows:
+                if entry.is_dir():
+                    folder_items.append(f"  [dir] {entry.name}")
+                else:
+                    folder_items.append(
+                        f"  [file] {entry.name} ({_format_size(entry.stat().st_size)})"
+                    )
+
+            display_path = f"working/{folder_context}" if folder_context else "working/"
+            items_listing = "\n".join(folder_items) if folder_items else "  (empty directory)"
+            logger.info(f"[WS] Folder context added: {display_path} ({len(folder_items)} items)")
+            return (
+                f"--- Folder context: {display_path} ---\n"
+                f"The user is currently browsing this folder. Contents:\n"
+                f"{items_listing}\n"
+                f"--- End of folder context ---"
+            )
+        else:
+            logger.warning(f"[WS] folder_context path is not a directory: {folder_context}")
+    except ValueError as e:
+        logger.warning(f"[WS] folder_context path traversal blocked: {e}")
+    except Exception as e:
+        logger.warning(f"[WS] Failed to resolve folder_context: {e}")
+    return None
+
+
+# Cap concurrent @-ref reads so a message with dozens of attachments doesn't
+# take over the shared default thread pool; 8 saturates a typical SSD
+_FILE_REF_READS = asyncio.Semaphore(8)
+
+
+async def _read_file_ref(ref_path: str) -> str:
+    async with _FILE_REF_READS:
+        return await asyncio.to_thread(_build_file_ref_block, ref_path)
+
+
 @app.websocket("/ws/chat")
 async def chat_websocket(ws: WebSocket):
     await ws.accept()
@@ -1488,6 +1909,8 @@ async def chat_websocket(ws: WebSocket):
     manager = ClydeChatManager(working_dir=WORKING_DIR, ws=ws)
     session_id: str | None = None
     is_first_user_message = True
+    # (mtime_ns, size) of registry.json as of the last registry_update sent
+    registry_sent_sig: tuple[int, int] | None = None
 
     # Queue for incoming WebSocket messages that arrive during send_message
     # This solves the deadlock: permission_response messages must be processed
@@ -1502,8 +1925,15 @@ async def chat_websocket(ws: WebSocket):
         """Continuously read from WebSocket and enqueue messages."""
         try:
             while True:
-                raw = await ws.receive_text()
-                data = json.loads(raw)
+                # Accept text or binary frames — orjson parses bytes directly,
+                # so binary clients skip the UTF-8 decode to str entirely
+                message = await ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                raw = message.get("text")
+                if raw is None:
+                    raw = message.get("bytes")
+                data = orjson.loads(raw)
                 await ws_incoming.put(data)
         except WebSocketDisconnect:
             await ws_incoming.put({"type": "__disconnect__"})
@@ -1601,55 +2031,49 @@ async def chat_websocket(ws: WebSocket):
             sdk_session_id=stored_sdk_session_id,
         )
 
-        # Notify frontend of session (session_id is null for deferred new chats)
-        await ws.send_json({"type": "init", "data": {"session_id": session_id}})
-
-        # If resuming, send prior messages to frontend for display
-        if prior_messages:
-            await ws.send_json({
-                "type": "session_history",
-                "data": {
-                    "messages": [
-                        {
-                            "id": m["id"],
-                            "session_id": m["session_id"],
-                            "role": m["role"],
-                            "agent_name": m.get("agent_name"),
-                            "content": m["content"],
-                            "cost_usd": m.get("cost_usd", 0),
-                            "metadata": m.get("metadata", {}),
-                            "created_at": m["created_at"],
-                        }
-                        for m in prior_messages
-                    ]
-                },
-            })
-
-        # Send persisted activity events for the session
+        # Load persisted activity events for the session
+        activity_events: list[dict] = []
         if session_id:
             try:
                 activity_events = await get_activity_events(session_id)
-                if activity_events:
-                    await ws.send_json({
-                        "type": "activity_history",
-                        "data": {
-                            "events": [
-                                {
-                                    "id": e["id"],
-                                    "agent_id": e["agent_id"],
-                                    "agent_name": e["agent_name"],
-                                    "event_type": e["event_type"],
-                                    "description": e.get("description", ""),
-                                    "metadata": e.get("metadata", {}),
-                                    "created_at": e["created_at"],
-                                }
-                                for e in activity_events
-                            ]
-                        },
-                    })
             except Exception as e:
                 logger.error(f"[WS] Failed to load activity events: {e}")
 
+        # Notify frontend of session (session_id is null for deferred new chats)
+        # plus, when resuming, prior messages and activity — one frame, one
+        # orjson encode, instead of init/session_history/activity_history
+        await _send_orjson(ws, {
+            "type": "session_init_bundle",
+            "data": {
+                "session_id": session_id,
+                "messages": [
+                    {
+                        "id": m["id"],
+                        "session_id": m["session_id"],
+                        "role": m["role"],
+                        "agent_name": m.get("agent_name"),
+                        "content": m["content"],
+                        "cost_usd": m.get("cost_usd", 0),
+                        "metadata": m.get("metadata", {}),
+                        "created_at": m["created_at"],
+                    }
+                    for m in prior_messages
+                ],
+                "activity": [
+                    {
+                        "id": e["id"],
+                        "agent_id": e["agent_id"],
+                        "agent_name": e["agent_name"],
+                        "event_type": e["event_type"],
+                        "description": e.get("description", ""),
+                        "metadata": e.get("metadata", {}),
+                        "created_at": e["created_at"],
+                    }
+                    for e in activity_events
+                ],
+            },
+        })
+
         # Start the background WebSocket reader
         ws_reader_task = asyncio.create_task(_ws_reader())
 
@@ -1665,110 +2089,32 @@ async def chat_websocket(ws: WebSocket):
 
                 # Build context from referenced files (@-mentions and uploads)
                 file_refs = data.get("file_refs", [])
-                agent_content = user_content
+                # Prompt sections — folder listing, file contents, then the
+                # user's text — joined once at the end
+                file_context_parts: list[str] = []
                 if file_refs:
-                    file_context_parts = []
-                    image_refs = []  # Images handled separately via Read tool
-                    max_file_size = 1_000_000  # 1MB limit per file
-                    _IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".svg", ".ico"}
-
-                    for ref_path in file_refs:
-                        try:
-                            target = _safe_resolve(ref_path)
-                            if not target.is_file():
-                                file_context_parts.append(
-                                    f"--- @{ref_path} ---\n[File not found]\n--- End of @{ref_path} ---"
-                                )
-                                continue
-                            file_size = target.stat().st_size
-                            ext = target.suffix.lower()
-
-                            # Images: don't inline binary data — tell Claude to
-                            # use its Read tool which handles images natively
-                            if ext in _IMAGE_EXTENSIONS:
-                                size_kb = round(file_size / 1024)
-                                image_refs.append(ref_path)
-                                file_context_parts.append(
-                                    f"--- @{ref_path} ---\n"
-                                    f"[Image file ({ext}, {size_kb}KB). "
-                                    f"Use the Read tool on the absolute path to view this image: "
-                                    f"{target}]\n"
-                                    f"--- End of @{ref_path} ---"
-                                )
-                                continue
-
-                            if file_size > max_file_size:
-                                size_mb = round(file_size / 1_000_000, 1)
-                                file_context_parts.append(
-                                    f"--- @{ref_path} ---\n[File too large to inline: {size_mb}MB. The file exists at {ref_path} in the working directory.]\n--- End of @{ref_path} ---"
-                                )
-                                continue
-                            # Try reading as text
-                            try:
-                                text = target.read_text(encoding="utf-8")
-                                file_context_parts.append(
-                                    f"--- Contents of @{ref_path} ---\n{text}\n--- End of @{ref_path} ---"
-                                )
-                            except (UnicodeDecodeError, ValueError):
-                                # Binary file — don't inline, just reference
-                                file_context_parts.append(
-                                    f"--- @{ref_path} ---\n[Binary file ({ext}) — {round(file_size/1024)}KB. "
-                                    f"Cannot display inline. The file exists at {target} "
-                                    f"and can be accessed via the Read tool.]\n--- End of @{ref_path} ---"
-                                )
-                        except Exception as e:
-                            logger.warning(f"[WS] Failed to read referenced file {ref_path}: {e}")
-                            file_context_parts.append(
-                                f"--- @{ref_path} ---\n[Error reading file: {e}]\n--- End of @{ref_path} ---"
-                            )
-                    if file_context_parts:
-                        agent_content = "\n\n".join(file_context_parts) + "\n\n" + user_content
+                    # Read referenced files in worker threads so large or
+                    # numerous refs don't stall the event loop (and other
+                    # clients' permission responses) while they load.
+                    # Repeat @-mentions of a file are resolved and inlined once.
+                    file_context_parts = await asyncio.gather(
+                        *(_read_file_ref(r) for r in dict.fromkeys(file_refs))
+                    )
 
                 # Build context from folder reference (FileBrowser "Start Chat")
                 folder_context = data.get("folder_context")
+                folder_listing = None
                 if folder_context is not None:
-                    try:
-                        folder_target = (
-                            _safe_resolve(folder_context)
-                            if folder_context
-                            else Path(WORKING_DIR).resolve()
-                        )
-                        if folder_target.is_dir():
-                            folder_items = []
-                            for entry in sorted(
-                                folder_target.iterdir(),
-                                key=lambda e: (not e.is_dir(), e.name.lower()),
-                            ):
-                                if entry.name.startswith("."):
-                                    continue
-                                if entry.is_dir():
-                                    folder_items.append(f"  [dir] {entry.name}")
-                                else:
-                                    size_bytes = entry.stat().st_size
-                                    if size_bytes < 1024:
-                                        size_str = f"{size_bytes} B"
-                                    elif size_bytes < 1024 * 1024:
-                                        size_str = f"{round(size_bytes / 1024, 1)} KB"
-                                    else:
-                                        size_str = f"{round(size_bytes / (1024 * 1024), 1)} MB"
-                                    folder_items.append(f"  [file] {entry.name} ({size_str})")
-
-                            display_path = f"working/{folder_context}" if folder_context else "working/"
-                            items_listing = "\n".join(folder_items) if folder_items else "  (empty directory)"
-                            folder_listing = (
-                                f"--- Folder context: {display_path} ---\n"
-                                f"The user is currently browsing this folder. Contents:\n"
-                                f"{items_listing}\n"
-                                f"--- End of folder context ---"
-                            )
-                            agent_content = folder_listing + "\n\n" + agent_content
-                            logger.info(f"[WS] Folder context added: {display_path} ({len(folder_items)} items)")
-                        else:
-                            logger.warning(f"[WS] folder_context path is not a directory: {folder_context}")
-                    except ValueError as e:
-                        logger.warning(f"[WS] folder_context path traversal blocked: {e}")
-                    except Exception as e:
-                        logger.warning(f"[WS] Failed to resolve folder_context: {e}")
+                    # Resolving and listing run in a worker thread — a large
+                    # directory on a slow filesystem shouldn't stall the loop
+                    folder_listing = await asyncio.to_thread(
+                        _build_folder_listing, folder_context
+                    )
+
+                ctx_parts: list[str] = [folder_listing] if folder_listing else []
+                ctx_parts.extend(file_context_parts)
+                ctx_parts.append(user_content)
+                agent_content = "\n\n".join(ctx_parts)
 
                 # Lazy session creation: persist on first message only
                 if session_id is None:
@@ -1777,7 +2123,7 @@ async def chat_websocket(ws: WebSocket):
                     is_first_user_message = True
                     logger.info(f"[WS] Created session on first message: {session_id}")
                     # Notify frontend of the real session_id + add to sidebar
-                    await ws.send_json({
+                    await _send_orjson(ws, {
                         "type": "session_created",
                         "data": {
                             "session_id": session_id,
@@ -1786,20 +2132,22 @@ async def chat_websocket(ws: WebSocket):
                         },
                     })
 
-                # Save user message to Supabase with embedding (fire concurrently — don't block agent)
-                async def _save_user_message():
-                    try:
-                        user_embedding = await generate_embedding(user_content)
-                    except Exception:
-                        user_embedding = None
-                    await save_message(
+                # Save user message to Supabase (fire concurrently — don't block agent).
+                # The row goes in now so it orders before Clyde's reply; its
+                # embedding request is in flight while the SDK starts up and
+                # is backfilled onto the row when both finish.
+                user_message_task = asyncio.create_task(
+                    save_message(
                         session_id=session_id,
                         role="user",
                         content=user_content,
-                        embedding=user_embedding,
                     )
-
-                asyncio.create_task(_save_user_message())
+                )
+                backfill_task = asyncio.create_task(
+                    _backfill_user_embedding(user_message_task, user_content)
+                )
+                _backfill_tasks.add(backfill_task)
+                backfill_task.add_done_callback(_backfill_tasks.discard)
 
                 # Start a concurrent task to process incoming messages
                 # (permission responses, cancel requests) while streaming.
@@ -1818,7 +2166,7 @@ async def chat_websocket(ws: WebSocket):
                     async for chunk in manager.send_message(agent_content):
                         if not ws_dead:
                             try:
-                                await ws.send_json(chunk)
+                                await _send_orjson(ws, chunk)
                             except Exception:
                                 # Client disconnected mid-stream. Keep consuming
                                 # the SDK iterator so we can still save the full
@@ -1926,7 +2274,7 @@ async def chat_websocket(ws: WebSocket):
                         logger.error(f"[WS] Failed to re-initialize after cancel: {e}")
                     # Notify frontend
                     try:
-                        await ws.send_json({
+                        await _send_orjson(ws, {
                             "type": "cancel_confirmed",
                             "data": {"message": "Response cancelled"},
                         })
@@ -1979,14 +2327,7 @@ async def chat_websocket(ws: WebSocket):
                     # Log delegated subagent work so they appear as active
                     # in the performance stats (prevents false "inactive" insights)
                     try:
-                        delegated_agents: set[str] = set()
-                        for step in manager._response_steps:
-                            if step.get("type") == "agent_stopped":
-                                agent_label = step.get("label", "")
-                                if agent_label and agent_label.lower() != "clyde":
-                                    delegated_agents.add(agent_label)
-
-                        for agent_name in delegated_agents:
+                        for agent_name in manager._delegated_agents:
                             _performance_logger.log_event(
                                 session_id=session_id,
                                 agent_name=agent_name,
@@ -2022,11 +2363,16 @@ async def chat_websocket(ws: WebSocket):
 
                 async def _store_sdk_session_id():
                     """Persist the CLI's session ID so future reconnects can
-                    resume natively instead of building a manual context summary."""
+                    resume natively instead of building a manual context summary.
+
+                    The ID normally stays the same for the whole connection, so
+                    the metadata read + write is skipped unless it changed."""
+                    nonlocal stored_sdk_session_id
                     sdk_sid = manager._sdk_session_id
-                    if sdk_sid and session_id:
+                    if sdk_sid and session_id and sdk_sid != stored_sdk_session_id:
                         try:
                             await update_session_sdk_id(session_id, sdk_sid)
+                            stored_sdk_session_id = sdk_sid
                         except Exception as e:
                             logger.warning(f"[WS] Failed to store SDK session ID: {e}")
 
@@ -2056,7 +2402,7 @@ async def chat_websocket(ws: WebSocket):
                         if len(user_content) > 40:
                             auto_title += "..."
                         await update_session_title(session_id, auto_title)
-                        await ws.send_json({
+                        await _send_orjson(ws, {
                             "type": "session_title_update",
                             "data": {
                                 "session_id": session_id,
@@ -2067,29 +2413,16 @@ async def chat_websocket(ws: WebSocket):
                         pass
 
                 # After each turn, send registry update so frontend
-                # can refresh the agent list (org chart, activity panel)
+                # can refresh the agent list (org chart, activity panel).
+                # Skipped when registry.json hasn't changed since this
+                # connection's last update.
                 try:
-                    registry = load_registry(WORKING_DIR)
-                    agents = registry.get("agents", [])
-                    await ws.send_json({
-                        "type": "registry_update",
-                        "data": {
-                            "agent_count": len(agents),
-                            "agents": [
-                                {
-                                    "id": a["id"],
-                                    "name": a["name"],
-                                    "role": a["role"],
-                                    "model": a.get("model", "sonnet"),
-                                    "avatar": a.get("avatar"),
-                                    "status": a.get("status", "active"),
-                                    "tools": a.get("tools", []),
-                                    "skills": a.get("skills", []),
-                                }
-                                for a in agents
-                            ],
-                        },
-                    })
+                    registry_sig, registry_frame = await asyncio.to_thread(
+                        _registry_update_frame
+                    )
+                    if registry_sig != registry_sent_sig:
+                        await ws.send_text(registry_frame)
+                        registry_sent_sig = registry_sig
                 except Exception:
                     pass
 
@@ -2103,7 +2436,7 @@ async def chat_websocket(ws: WebSocket):
     except Exception as e:
         logger.error(f"[WS] Error in chat websocket: {e}", exc_info=True)
         try:
-            await ws.send_json({"type": "error", "data": {"message": str(e)}})
+            await _send_orjson(ws, {"type": "error", "data": {"message": str(e)}})
         except Exception:
             pass
     finally:
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, Any
 
 
@@ -12,6 +12,10 @@ class UserMessage(BaseModel):
 
 
 class AgentStreamChunk(BaseModel):
+    # Server-generated and never mutated. The websocket stream sends plain
+    # dicts; build one of these with model_construct() if ever needed there.
+    model_config = ConfigDict(frozen=True)
+
     type: str  # "assistant_text", "tool_use", "tool_result", "result", "error", "init"
     data: dict[str, Any]
 
@@ -90,6 +94,8 @@ class PermissionResponse(BaseModel):
 
 
 class ActivityEvent(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: Optional[str] = None
     session_id: Optional[str] = None
     agent_id: str
@@ -1,24 +1,55 @@
+import hashlib
 import os
-from openai import OpenAI
+from collections import OrderedDict
 
-_client: OpenAI | None = None
+from openai import AsyncOpenAI
+
+_client: AsyncOpenAI | None = None
 
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 
+# text-embedding-3-small accepts at most 8192 tokens per input; ~28k chars
+# stays safely under that, so long replies embed their opening instead of
+# failing the request
+_MAX_EMBED_CHARS = 28000
+
+# In-process LRU of recent embeddings keyed on a content hash — repeated
+# texts ("continue", "ok", re-pasted snippets) skip the API round trip
+_CACHE_MAX = 512
+_embed_cache: OrderedDict[bytes, list[float]] = OrderedDict()
 
-def get_openai_client() -> OpenAI:
+
+def get_openai_client() -> AsyncOpenAI:
     global _client
     if _client is None:
-        _client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        _client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
     return _client
 
 
+def _cache_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
 async def generate_embedding(text: str) -> list[float]:
-    """Generate embedding for document storage."""
+    """Generate embedding for document storage.
+
+    Recently embedded texts are served from memory.
+    """
+    text = text[:_MAX_EMBED_CHARS]
+    key = _cache_key(text)
+    cached = _embed_cache.get(key)
+    if cached is not None:
+        _embed_cache.move_to_end(key)
+        return cached
+
     client = get_openai_client()
-    response = client.embeddings.create(input=[text], model=EMBEDDING_MODEL)
-    return response.data[0].embedding
+    response = await client.embeddings.create(input=[text], model=EMBEDDING_MODEL)
+    embedding = response.data[0].embedding
+    _embed_cache[key] = embedding
+    while len(_embed_cache) > _CACHE_MAX:
+        _embed_cache.popitem(last=False)
+    return embedding
 
 
 async def generate_query_embedding(text: str) -> list[float]:
@@ -8,17 +8,69 @@ Uses watchfiles (Rust-backed, async-native) for efficient file monitoring.
 
 import asyncio
 import fnmatch
-import json
 import logging
 import os
 import random
+import re
+import tempfile
 from datetime import datetime, timezone
-from pathlib import Path
+from typing import Callable
 
+import orjson
 import watchfiles
 
 logger = logging.getLogger(__name__)
 
+# Delay before persisting fire_count bumps, so bursts share one write
+_SAVE_DEBOUNCE_SECONDS = 1.0
+
+# Headless sessions a single trigger may run at once when a batch of
+# matching files lands together (e.g. an rsync or archive extraction)
+_MAX_CONCURRENT_RUNS = 3
+
+
+class _AddedMatching(watchfiles.DefaultFilter):
+    """Pass only newly added files whose name some trigger's glob matches.
+
+    Runs inside watchfiles before a batch is yielded, so modifications,
+    deletions and non-matching names never wake the watch loop. The default
+    ignore rules (editor swap files, .git, __pycache__, ...) still apply.
+    """
+
+    def __init__(self, matches: Callable[[str], bool]):
+        super().__init__()
+        self._matches = matches
+
+    def __call__(self, change: watchfiles.Change, path: str) -> bool:
+        return (
+            change == watchfiles.Change.added
+            and self._matches(os.path.basename(path))
+            and super().__call__(change, path)
+        )
+
+
+async def _embed_or_none(text: str) -> list[float] | None:
+    """Embed text for a saved message; embeddings are optional, so failures
+    just leave the message without one."""
+    from services.embeddings import generate_embedding
+
+    try:
+        return await generate_embedding(text)
+    except Exception:
+        return None
+
+
+def _compile_glob(pattern: str) -> Callable[[str], bool]:
+    """Build a filename predicate for a glob, skipping regex for the common
+    literal ("report.csv") and suffix ("*.pdf") forms."""
+    if not any(c in pattern for c in "*?["):
+        return pattern.__eq__
+    suffix = pattern[1:]
+    if pattern.startswith("*") and not any(c in suffix for c in "*?["):
+        return lambda name: name.endswith(suffix)
+    match = re.compile(fnmatch.translate(pattern)).match
+    return lambda name: match(name) is not None
+
 
 class FileWatcherService:
     """Watches directories for file changes and triggers Clyde tasks."""
@@ -27,7 +79,14 @@ class FileWatcherService:
         self.working_dir = working_dir
         self._triggers: list[dict] = []
         self._triggers_path = os.path.join(working_dir, "triggers.json")
+        # One watcher task per directory, shared by every trigger on it:
+        # watch_path -> {trigger_id: (trigger, name matcher, run slots)}
         self._watch_tasks: dict[str, asyncio.Task] = {}
+        self._subscribers: dict[
+            str, dict[str, tuple[dict, Callable[[str], bool], asyncio.Semaphore]]
+        ] = {}
+        self._run_tasks: dict[str, set[asyncio.Task]] = {}
+        self._save_handle: asyncio.TimerHandle | None = None
         self._load_triggers()
 
     # ─── Persistence ──────────────────────────────────────────
@@ -36,8 +95,8 @@ class FileWatcherService:
         """Load triggers from JSON file."""
         if os.path.exists(self._triggers_path):
             try:
-                with open(self._triggers_path, "r") as f:
-                    data = json.load(f)
+                with open(self._triggers_path, "rb") as f:
+                    data = orjson.loads(f.read())
                 self._triggers = data.get("triggers", [])
                 logger.info(f"[FILE_WATCHER] Loaded {len(self._triggers)} triggers")
             except Exception as e:
@@ -47,10 +106,40 @@ class FileWatcherService:
             self._triggers = []
 
     def _save_triggers(self) -> None:
-        """Persist triggers to JSON file."""
-        os.makedirs(os.path.dirname(self._triggers_path), exist_ok=True)
-        with open(self._triggers_path, "w") as f:
-            json.dump({"triggers": self._triggers}, f, indent=2, default=str)
+        """Atomically persist triggers to JSON file (write to tmp, then rename)."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
+        dir_name = os.path.dirname(self._triggers_path)
+        os.makedirs(dir_name, exist_ok=True)
+        data = orjson.dumps({"triggers": self._triggers}, option=orjson.OPT_INDENT_2)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".json")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._triggers_path)
+        except Exception:
+            # Clean up temp file on failure
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _schedule_save(self) -> None:
+        """Debounce a save for frequent, non-critical updates like fire_count."""
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                _SAVE_DEBOUNCE_SECONDS, self._flush_save
+            )
+
+    def _flush_save(self) -> None:
+        """Write a pending debounced save now (clears the timer)."""
+        try:
+            self._save_triggers()
+        except Exception as e:
+            logger.error(f"[FILE_WATCHER] Failed to save triggers: {e}")
 
     # ─── CRUD ─────────────────────────────────────────────────
 
@@ -99,10 +188,7 @@ class FileWatcherService:
         self._triggers = [t for t in self._triggers if t["id"] != trigger_id]
         self._save_triggers()
 
-        # Cancel watcher task
-        task = self._watch_tasks.pop(trigger_id, None)
-        if task and not task.done():
-            task.cancel()
+        self._stop_watcher(trigger_id)
 
         logger.info(f"[FILE_WATCHER] Removed trigger: {trigger_id}")
         return True
@@ -125,9 +211,7 @@ class FileWatcherService:
                 self._save_triggers()
 
                 # Restart watcher if config changed
-                task = self._watch_tasks.pop(trigger_id, None)
-                if task and not task.done():
-                    task.cancel()
+                self._stop_watcher(trigger_id)
                 if t.get("enabled", True):
                     self._start_watcher(t)
 
@@ -137,7 +221,7 @@ class FileWatcherService:
     # ─── File Watching ────────────────────────────────────────
 
     def _start_watcher(self, trigger: dict) -> None:
-        """Start an async file watcher for a trigger."""
+        """Attach a trigger to its directory's watcher, starting one if needed."""
         if not trigger.get("enabled", True):
             return
 
@@ -148,55 +232,95 @@ class FileWatcherService:
             )
             return
 
-        task = asyncio.create_task(self._watch_directory(trigger))
-        self._watch_tasks[trigger["id"]] = task
-
-    async def _watch_directory(self, trigger: dict) -> None:
-        """Watch a directory and fire trigger when matching files change."""
-        watch_path = trigger["watch_path"]
-        pattern = trigger["pattern"]
-        trigger_id = trigger["id"]
-
+        subscribers = self._subscribers.setdefault(watch_path, {})
+        subscribers[trigger["id"]] = (
+            trigger,
+            _compile_glob(trigger["pattern"]),
+            asyncio.Semaphore(_MAX_CONCURRENT_RUNS),
+        )
         logger.info(
-            f"[FILE_WATCHER] Watching: {watch_path} for {pattern}"
+            f"[FILE_WATCHER] Watching: {watch_path} for {trigger['pattern']}"
         )
 
-        try:
-            async for changes in watchfiles.awatch(watch_path):
-                for change_type, changed_path in changes:
-                    # Only fire on new files, ignore modifications and deletions
-                    if change_type != watchfiles.Change.added:
-                        continue
+        task = self._watch_tasks.get(watch_path)
+        if task is None or task.done():
+            self._watch_tasks[watch_path] = asyncio.create_task(
+                self._watch_directory(watch_path, subscribers)
+            )
 
-                    filename = Path(changed_path).name
+    def _stop_watcher(self, trigger_id: str) -> None:
+        """Detach a trigger and cancel its in-flight runs; a directory's
+        watcher stops with its last trigger."""
+        for task in self._run_tasks.pop(trigger_id, ()):
+            task.cancel()
 
-                    # Check if filename matches the glob pattern
-                    if not fnmatch.fnmatch(filename, pattern):
-                        continue
+        for watch_path, subscribers in list(self._subscribers.items()):
+            if subscribers.pop(trigger_id, None) and not subscribers:
+                del self._subscribers[watch_path]
+                task = self._watch_tasks.pop(watch_path, None)
+                if task and not task.done():
+                    task.cancel()
 
+    async def _watch_directory(
+        self,
+        watch_path: str,
+        subscribers: dict[str, tuple[dict, Callable[[str], bool], asyncio.Semaphore]],
+    ) -> None:
+        """Watch a directory and fire each trigger whose pattern matches an
+        added file. subscribers is live: triggers come and go while it runs."""
+
+        def wanted(name: str) -> bool:
+            return any(matches(name) for _, matches, _ in subscribers.values())
+
+        try:
+            # Only new files directly in watch_path that match a pattern get
+            # through; triggers resolve files as watch_path/filename
+            async for changes in watchfiles.awatch(
+                watch_path,
+                watch_filter=_AddedMatching(wanted),
+                recursive=False,
+            ):
+                filenames = sorted(os.path.basename(p) for _, p in changes)
+                for trigger_id, (trigger, matches, runs) in list(subscribers.items()):
+                    hits = [f for f in filenames if matches(f)]
+                    if not hits:
+                        continue
                     logger.info(
                         f"[FILE_WATCHER] Trigger {trigger['name']}: "
-                        f"{filename} added"
+                        f"{len(hits)} file(s) added: {', '.join(hits)}"
                     )
-
-                    # Execute the trigger
-                    await self._execute_trigger(trigger, filename, "added")
+                    # Runs are tasks so a long session doesn't hold up the
+                    # other triggers on this directory; the semaphore keeps a
+                    # burst to a few sessions at a time
+                    tasks = self._run_tasks.setdefault(trigger_id, set())
+                    for filename in hits:
+                        task = asyncio.create_task(
+                            self._execute_limited(runs, trigger, filename)
+                        )
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
 
         except asyncio.CancelledError:
-            logger.info(f"[FILE_WATCHER] Watcher stopped for: {trigger_id}")
+            logger.info(f"[FILE_WATCHER] Watcher stopped for: {watch_path}")
         except Exception as e:
             logger.error(
-                f"[FILE_WATCHER] Watcher error for {trigger_id}: {e}",
+                f"[FILE_WATCHER] Watcher error for {watch_path}: {e}",
                 exc_info=True,
             )
 
+    async def _execute_limited(
+        self, runs: asyncio.Semaphore, trigger: dict, filename: str
+    ) -> None:
+        """Execute a trigger for one added file once a run slot is free."""
+        async with runs:
+            await self._execute_trigger(trigger, filename, "added")
+
     async def _execute_trigger(
         self, trigger: dict, filename: str, change_type: str
     ) -> None:
         """Execute a trigger by creating a headless Clyde session."""
         from agents.clyde import ClydeChatManager
         from services.supabase_client import create_session, save_message
-        from services.embeddings import generate_embedding
 
         trigger_name = trigger["name"]
         watch_path = trigger["watch_path"]
@@ -212,6 +336,9 @@ class FileWatcherService:
 
         logger.info(f"[FILE_WATCHER] Executing trigger: {trigger_name}")
 
+        # Embed the prompt while the session and manager are being set up
+        user_embedding_task = asyncio.create_task(_embed_or_none(prompt))
+
         try:
             # Create a new session
             session_title = f"[Trigger] {trigger_name}: {filename}"
@@ -227,16 +354,11 @@ class FileWatcherService:
             await manager.initialize()
 
             # Save user message
-            try:
-                user_embedding = await generate_embedding(prompt)
-            except Exception:
-                user_embedding = None
-
             await save_message(
                 session_id=session_id,
                 role="user",
                 content=prompt,
-                embedding=user_embedding,
+                embedding=await user_embedding_task,
                 agent_name="[Trigger]",
             )
 
@@ -252,10 +374,7 @@ class FileWatcherService:
 
             # Save response
             if full_response:
-                try:
-                    clyde_embedding = await generate_embedding(full_response)
-                except Exception:
-                    clyde_embedding = None
+                clyde_embedding = await _embed_or_none(full_response)
 
                 await save_message(
                     session_id=session_id,
@@ -271,7 +390,7 @@ class FileWatcherService:
 
             # Update trigger metadata
             trigger["fire_count"] = trigger.get("fire_count", 0) + 1
-            self._save_triggers()
+            self._schedule_save()
 
             logger.info(
                 f"[FILE_WATCHER] Completed: {trigger_name} "
@@ -297,15 +416,21 @@ class FileWatcherService:
         )
 
     async def stop(self) -> None:
-        """Stop all watcher tasks."""
-        for trigger_id, task in self._watch_tasks.items():
+        """Stop all watcher tasks and flush any pending trigger save."""
+        if self._save_handle is not None:
+            self._flush_save()
+
+        tasks = list(self._watch_tasks.values())
+        for run_tasks in self._run_tasks.values():
+            tasks.extend(run_tasks)
+        for task in tasks:
             if not task.done():
                 task.cancel()
 
         # Wait for all tasks to finish
-        if self._watch_tasks:
-            await asyncio.gather(
-                *self._watch_tasks.values(), return_exceptions=True
-            )
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
         self._watch_tasks.clear()
+        self._subscribers.clear()
+        self._run_tasks.clear()
         logger.info("[FILE_WATCHER] Stopped all watchers")
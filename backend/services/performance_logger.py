@@ -7,11 +7,12 @@ optimisation.
 """
 
 import gzip
-import json
+import orjson
 import logging
 import os
 import shutil
-from collections import defaultdict
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -20,6 +21,73 @@ logger = logging.getLogger(__name__)
 # Maximum log file size before rotation (10 MB)
 _MAX_LOG_SIZE_BYTES = 10 * 1024 * 1024
 
+# Trailing spaces reserved on un-rated lines so record_feedback can swap
+# null for "positive"/"negative" without outgrowing the line
+_FEEDBACK_SLACK = b" " * 8
+
+# Parsed entries per log path, shared by every PerformanceLogger instance
+# (agent tools and the proactive engine create short-lived ones). Appends are
+# parsed incrementally; any other change re-reads the file.
+_entry_cache: dict[str, dict[str, Any]] = {}
+_entry_cache_lock = threading.Lock()
+
+# Append-mode descriptors for the log and index files, kept open across
+# events and shared by every instance: path -> (fd, inode). Reopened when the
+# path no longer points at the same file (rotation, splice, deletion).
+_append_fds: dict[str, tuple[int, int]] = {}
+_append_lock = threading.Lock()
+
+# Rotated logs are gzipped one at a time in the background
+_compress_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="perf-gzip")
+
+
+def _parse_lines(data: bytes) -> list[dict]:
+    """Parse the non-empty JSONL lines in data, skipping malformed ones."""
+    entries = []
+    for line in data.split(b"\n"):
+        if line:
+            try:
+                entries.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
+    return entries
+
+
+def _append_fd(path: str) -> int:
+    """Return a shared O_APPEND descriptor for path (caller holds _append_lock)."""
+    cached = _append_fds.get(path)
+    if cached:
+        try:
+            if os.stat(path).st_ino == cached[1]:
+                return cached[0]
+        except FileNotFoundError:
+            pass
+        os.close(cached[0])
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    _append_fds[path] = (fd, os.fstat(fd).st_ino)
+    return fd
+
+
+def close_log_files() -> None:
+    """Close the shared append descriptors (app shutdown)."""
+    with _append_lock:
+        for fd, _ in _append_fds.values():
+            os.close(fd)
+        _append_fds.clear()
+
+
+def _group_by_agent(entries: list[dict]) -> dict[str, list[dict]]:
+    """Map agent_id and agent_name to the entries that carry them."""
+    by_agent: dict[str, list[dict]] = {}
+    for e in entries:
+        agent_id = e.get("agent_id")
+        agent_name = e.get("agent_name")
+        if agent_id is not None:
+            by_agent.setdefault(agent_id, []).append(e)
+        if agent_name is not None and agent_name != agent_id:
+            by_agent.setdefault(agent_name, []).append(e)
+    return by_agent
+
 
 class PerformanceLogger:
     """Append-only JSONL performance logger with rotation and query helpers."""
@@ -28,6 +96,9 @@ class PerformanceLogger:
         self.working_dir = working_dir
         self.logs_dir = os.path.join(working_dir, "logs")
         self.log_path = os.path.join(self.logs_dir, "performance.jsonl")
+        # Sidecar JSONL index of {session_id, offset, length} per log line so
+        # record_feedback can patch a single entry instead of rewriting the log.
+        self.index_path = os.path.join(self.logs_dir, "performance.idx")
         os.makedirs(self.logs_dir, exist_ok=True)
 
     # ------------------------------------------------------------------
@@ -50,11 +121,12 @@ class PerformanceLogger:
         num_turns: int = 0,
         prompt_version: int = 0,
     ) -> dict:
-        """Append a performance entry. Returns the written record."""
-        self._maybe_rotate()
-
+        """Append a performance entry. Returns the written record (with
+        the timestamp as a datetime)."""
         entry = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            # orjson writes aware datetimes in the same ISO-8601 form as
+            # isoformat(), without the Python-level formatting
+            "timestamp": datetime.now(timezone.utc),
             "session_id": session_id,
             "agent_id": agent_id,
             "agent_name": agent_name,
@@ -69,11 +141,31 @@ class PerformanceLogger:
             "prompt_version": prompt_version,
         }
 
-        try:
-            with open(self.log_path, "a") as f:
-                f.write(json.dumps(entry) + "\n")
-        except Exception as e:
-            logger.error(f"[PERF] Failed to write log entry: {e}")
+        data = orjson.dumps(entry)
+        if user_feedback is None:
+            data += _FEEDBACK_SLACK
+        data += b"\n"
+        with _append_lock:
+            try:
+                fd = _append_fd(self.log_path)
+                if os.fstat(fd).st_size >= _MAX_LOG_SIZE_BYTES:
+                    self._rotate()
+                    fd = _append_fd(self.log_path)
+                os.write(fd, data)
+                offset = os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+            except Exception as e:
+                logger.error(f"[PERF] Failed to write log entry: {e}")
+                return entry
+
+            # A missing index line is caught by _load_index and rebuilt from the log
+            try:
+                os.write(_append_fd(self.index_path), orjson.dumps({
+                    "session_id": session_id,
+                    "offset": offset,
+                    "length": len(data),
+                }) + b"\n")
+            except Exception as e:
+                logger.warning(f"[PERF] Failed to update log index: {e}")
 
         return entry
 
@@ -82,39 +174,78 @@ class PerformanceLogger:
     ) -> bool:
         """Update the user_feedback field on a matching log entry.
 
-        Since JSONL is append-only we rewrite the file — acceptable for the
-        expected file sizes (< 10 MB before rotation).
+        Looks the session's lines up in the sidecar index and patches the
+        first un-rated one in place. log_event leaves slack spaces on
+        un-rated lines, so the patched line is padded back to its original
+        length. If it still doesn't fit, the line is spliced into a rewritten
+        file so entries stay in timestamp order.
         """
-        if not os.path.exists(self.log_path):
+        try:
+            fd = os.open(self.log_path, os.O_RDWR)
+        except FileNotFoundError:
             return False
 
-        lines = self._read_lines()
-        updated = False
+        splice: tuple[int, int, bytes] | None = None
+        try:
+            index = self._load_index(os.fstat(fd).st_size)
+            for item in index:
+                if item["session_id"] != session_id:
+                    continue
+                offset, length = item["offset"], item["length"]
+                raw = os.pread(fd, length, offset)
+                try:
+                    entry = orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    continue  # Blank line or stale slot
+                if entry.get("user_feedback") is not None:
+                    continue
 
-        for i, entry in enumerate(lines):
-            if (
-                entry.get("session_id") == session_id
-                and entry.get("user_feedback") is None
-            ):
                 # Match by proximity to the provided message timestamp
                 entry["user_feedback"] = feedback
-                updated = True
-                break  # Update the first un-rated entry for this session
-
-        if updated:
-            self._write_lines(lines)
+                line = orjson.dumps(entry)
+                if len(line) < length:
+                    os.pwrite(fd, line.ljust(length - 1) + b"\n", offset)
+                    self._invalidate_entries()
+                    return True  # Update the first un-rated entry for this session
+                splice = (offset, length, line + b"\n")
+                break
+        finally:
+            os.close(fd)
 
-        return updated
+        if splice is None:
+            return False
+        self._splice_line(*splice)
+        self._invalidate_entries()
+        return True
 
     # ------------------------------------------------------------------
     # Read / Query
     # ------------------------------------------------------------------
 
     def get_all_stats(self, days: int = 30) -> dict[str, Any]:
-        """Aggregated performance stats across all agents."""
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        entries = self._read_since(cutoff)
+        """Aggregated performance stats across all agents.
 
+        Cached per window until the log changes; treat the result as read-only.
+        """
+        return self.get_stats_windows([days])[days]
+
+    def get_stats_windows(self, days_list: list[int]) -> dict[int, dict[str, Any]]:
+        """Aggregated stats for several windows, keyed by days.
+
+        Windows not already cached are sliced from a single read of the
+        widest one; results are cached like get_all_stats.
+        """
+        stats_by_days = self._load_entries()["stats_by_days"]
+        missing = sorted({d for d in days_list if d not in stats_by_days}, reverse=True)
+        if missing:
+            now = datetime.now(timezone.utc)
+            entries = self._read_since(now - timedelta(days=missing[0]))
+            for days in missing:
+                entries = _since(entries, (now - timedelta(days=days)).isoformat())
+                stats_by_days[days] = self._compute_all_stats(entries)
+        return {d: stats_by_days[d] for d in days_list}
+
+    def _compute_all_stats(self, entries: list[dict]) -> dict[str, Any]:
         if not entries:
             return {
                 "total_tasks": 0,
@@ -126,39 +257,48 @@ class PerformanceLogger:
             }
 
         total = len(entries)
-        errors = sum(1 for e in entries if e.get("is_error"))
+        errors = 0
+        total_cost = 0
+        total_time = 0
         feedbacks = {"positive": 0, "negative": 0, "none": 0}
+
+        # One pass over the entries fills the overall and per-agent totals
+        agent_map: dict[str, dict] = {}
+        agent_get = agent_map.get
         for e in entries:
+            name = e.get("agent_name", "Unknown")
+            is_error = e.get("is_error")
             fb = e.get("user_feedback")
+            cost = e.get("total_cost_usd", 0)
+            time_ms = e.get("completion_time_ms", 0)
+
+            data = agent_get(name)
+            if data is None:
+                data = agent_map[name] = {
+                    "tasks": 0,
+                    "errors": 0,
+                    "total_cost_usd": 0.0,
+                    "total_time_ms": 0,
+                    "positive": 0,
+                    "negative": 0,
+                }
+            data["tasks"] += 1
+            data["total_cost_usd"] += cost
+            data["total_time_ms"] += time_ms
+            total_cost += cost
+            total_time += time_ms
+            if is_error:
+                errors += 1
+                data["errors"] += 1
             if fb == "positive":
                 feedbacks["positive"] += 1
+                data["positive"] += 1
             elif fb == "negative":
                 feedbacks["negative"] += 1
+                data["negative"] += 1
             else:
                 feedbacks["none"] += 1
 
-        agent_map: dict[str, dict] = defaultdict(
-            lambda: {
-                "tasks": 0,
-                "errors": 0,
-                "total_cost_usd": 0.0,
-                "total_time_ms": 0,
-                "positive": 0,
-                "negative": 0,
-            }
-        )
-        for e in entries:
-            name = e.get("agent_name", "Unknown")
-            agent_map[name]["tasks"] += 1
-            if e.get("is_error"):
-                agent_map[name]["errors"] += 1
-            agent_map[name]["total_cost_usd"] += e.get("total_cost_usd", 0)
-            agent_map[name]["total_time_ms"] += e.get("completion_time_ms", 0)
-            if e.get("user_feedback") == "positive":
-                agent_map[name]["positive"] += 1
-            elif e.get("user_feedback") == "negative":
-                agent_map[name]["negative"] += 1
-
         by_agent = []
         for name, data in sorted(
             agent_map.items(), key=lambda x: x[1]["tasks"], reverse=True
@@ -181,11 +321,7 @@ class PerformanceLogger:
                 "negative_feedback": data["negative"],
             })
 
-        avg_time = (
-            round(sum(e.get("completion_time_ms", 0) for e in entries) / total)
-            if total
-            else 0
-        )
+        avg_time = round(total_time / total) if total else 0
 
         # Overall: count tasks that errored or received negative feedback as failures
         total_failures = min(errors + feedbacks["negative"], total)
@@ -197,9 +333,7 @@ class PerformanceLogger:
             "overall_success_rate": overall_success,
             "total_agents": len(agent_map),
             "avg_completion_ms": avg_time,
-            "total_cost_usd": round(
-                sum(e.get("total_cost_usd", 0) for e in entries), 4
-            ),
+            "total_cost_usd": round(total_cost, 4),
             "by_agent": by_agent,
             "feedback_breakdown": feedbacks,
         }
@@ -207,10 +341,7 @@ class PerformanceLogger:
     def get_agent_stats(self, agent_id: str, days: int = 30) -> dict[str, Any]:
         """Performance stats for a specific agent."""
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        entries = [
-            e for e in self._read_since(cutoff)
-            if e.get("agent_id") == agent_id or e.get("agent_name") == agent_id
-        ]
+        entries = self._read_since(cutoff, agent_id)
 
         if not entries:
             return {
@@ -255,24 +386,14 @@ class PerformanceLogger:
 
     def get_recent_logs(self, agent_id: str | None = None, limit: int = 20) -> list[dict]:
         """Return the most recent log entries, optionally filtered by agent."""
-        lines = self._read_lines()
-        if agent_id:
-            lines = [
-                e for e in lines
-                if e.get("agent_id") == agent_id or e.get("agent_name") == agent_id
-            ]
+        lines = self._agent_lines(agent_id) if agent_id else self._read_lines()
         return lines[-limit:]
 
     def get_negative_streak(self, agent_id: str) -> int:
         """Count consecutive negative feedbacks since the last prompt change."""
-        lines = self._read_lines()
-        agent_lines = [
-            e for e in lines
-            if e.get("agent_id") == agent_id or e.get("agent_name") == agent_id
-        ]
         # Count from the end backwards
         streak = 0
-        for entry in reversed(agent_lines):
+        for entry in reversed(self._agent_lines(agent_id)):
             if entry.get("user_feedback") == "negative":
                 streak += 1
             elif entry.get("user_feedback") == "positive":
@@ -285,58 +406,165 @@ class PerformanceLogger:
     # ------------------------------------------------------------------
 
     def _read_lines(self) -> list[dict]:
-        """Read all entries from the current log file."""
-        if not os.path.exists(self.log_path):
-            return []
-        entries = []
-        with open(self.log_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line:
+        """All entries in the current log file (shared cache; don't mutate)."""
+        return self._load_entries()["entries"]
+
+    def _agent_lines(self, agent_id: str) -> list[dict]:
+        """Entries whose agent_id or agent_name matches, in log order."""
+        return self._load_entries()["by_agent"].get(agent_id, [])
+
+    def _load_entries(self) -> dict[str, Any]:
+        """Return the cached entries for the log, parsing only appended bytes."""
+        with _entry_cache_lock:
+            try:
+                st = os.stat(self.log_path)
+            except FileNotFoundError:
+                _entry_cache.pop(self.log_path, None)
+                return {"entries": [], "by_agent": {}, "stats_by_days": {}}
+
+            cached = _entry_cache.get(self.log_path)
+            start = 0
+            if cached and cached["ino"] == st.st_ino:
+                if (cached["size"], cached["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+                    return cached
+                if st.st_size > cached["size"]:
+                    start = cached["size"]
+
+            with open(self.log_path, "rb") as f:
+                f.seek(start)
+                data = f.read()
+            # Leave a partially written last line for the next read
+            end = data.rfind(b"\n") + 1
+            entries = _parse_lines(data[:end])
+            by_agent = _group_by_agent(entries)
+            if start:
+                entries = cached["entries"] + entries
+                # New lists for touched agents so older snapshots stay intact
+                merged = dict(cached["by_agent"])
+                for key, lines in by_agent.items():
+                    merged[key] = merged.get(key, []) + lines
+                by_agent = merged
+
+            cached = {
+                "ino": st.st_ino,
+                "size": start + end,
+                "mtime_ns": st.st_mtime_ns,
+                "entries": entries,
+                "by_agent": by_agent,
+                "stats_by_days": {},
+            }
+            _entry_cache[self.log_path] = cached
+            return cached
+
+    def _invalidate_entries(self) -> None:
+        """Drop the cached entries after an in-place edit of the log."""
+        with _entry_cache_lock:
+            _entry_cache.pop(self.log_path, None)
+
+    def _load_index(self, log_size: int) -> list[dict]:
+        """Return the line index, rebuilding it if it doesn't cover the log."""
+        index: list[dict] = []
+        try:
+            with open(self.index_path, "rb") as f:
+                for line in f:
                     try:
-                        entries.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
-        return entries
+                        index.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        index = []
+                        break
+        except FileNotFoundError:
+            pass
+
+        # The index is append-only alongside the log, so its last slot must
+        # end exactly at EOF. Anything else (rotation, a failed index write,
+        # a log from before the index existed) means rebuild.
+        indexed_end = index[-1]["offset"] + index[-1]["length"] if index else 0
+        if indexed_end == log_size:
+            return index
+        return self._rebuild_index()
+
+    def _rebuild_index(self) -> list[dict]:
+        """Scan the log once and rewrite the index from it (atomic)."""
+        index: list[dict] = []
+        offset = 0
+        with open(self.log_path, "rb") as f:
+            for raw in f:
+                # Blank and unparseable lines keep a slot so offsets stay
+                # contiguous up to EOF
+                try:
+                    session_id = orjson.loads(raw).get("session_id")
+                except (orjson.JSONDecodeError, AttributeError):
+                    session_id = None
+                index.append({
+                    "session_id": session_id,
+                    "offset": offset,
+                    "length": len(raw),
+                })
+                offset += len(raw)
+
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for item in index:
+                    f.write(orjson.dumps(item) + b"\n")
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"[PERF] Failed to rebuild log index: {e}")
+        return index
 
-    def _write_lines(self, entries: list[dict]) -> None:
-        """Rewrite the log file with the given entries (atomic)."""
+    def _splice_line(self, offset: int, length: int, data: bytes) -> None:
+        """Replace one line with a longer one (atomic rewrite + reindex)."""
+        with open(self.log_path, "rb") as f:
+            content = f.read()
         tmp_path = self.log_path + ".tmp"
-        with open(tmp_path, "w") as f:
-            for entry in entries:
-                f.write(json.dumps(entry) + "\n")
+        with open(tmp_path, "wb") as f:
+            f.write(content[:offset])
+            f.write(data)
+            f.write(content[offset + length:])
         os.replace(tmp_path, self.log_path)
-
-    def _read_since(self, cutoff: datetime) -> list[dict]:
-        """Read entries newer than cutoff."""
-        entries = self._read_lines()
-        result = []
-        cutoff_iso = cutoff.isoformat()
-        for e in entries:
-            ts = e.get("timestamp", "")
-            if ts >= cutoff_iso:
-                result.append(e)
-        return result
-
-    def _maybe_rotate(self) -> None:
-        """Archive the log file if it exceeds the size limit."""
-        if not os.path.exists(self.log_path):
-            return
+        self._rebuild_index()
+
+    def _read_since(self, cutoff: datetime, agent_id: str | None = None) -> list[dict]:
+        """Read entries newer than cutoff, oldest first, optionally for one agent."""
+        entries = self._agent_lines(agent_id) if agent_id else self._read_lines()
+        return _since(entries, cutoff.isoformat())
+
+    def _rotate(self) -> None:
+        """Archive the log file once it has reached the size limit."""
+        ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        rotated_path = f"{self.log_path}.{ts}"
+        archive_path = os.path.join(self.logs_dir, f"performance-{ts}.jsonl.gz")
         try:
-            size = os.path.getsize(self.log_path)
-        except OSError:
+            # Rename is instant; the log starts fresh and its index no
+            # longer applies
+            os.replace(self.log_path, rotated_path)
+            with open(self.log_path, "w") as f:
+                pass
+            with open(self.index_path, "w") as f:
+                pass
+        except Exception as e:
+            logger.error(f"[PERF] Failed to rotate log: {e}")
             return
-
-        if size >= _MAX_LOG_SIZE_BYTES:
-            ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
-            archive_path = os.path.join(self.logs_dir, f"performance-{ts}.jsonl.gz")
-            try:
-                with open(self.log_path, "rb") as f_in:
-                    with gzip.open(archive_path, "wb") as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                # Truncate the current file
-                with open(self.log_path, "w") as f:
-                    pass
-                logger.info(f"[PERF] Rotated log to {archive_path}")
-            except Exception as e:
-                logger.error(f"[PERF] Failed to rotate log: {e}")
+        _compress_executor.submit(_compress_archive, rotated_path, archive_path)
+
+
+def _since(entries: list[dict], cutoff_iso: str) -> list[dict]:
+    """Slice off the entries at or after cutoff_iso from a timestamp-ordered list."""
+    # Entries are appended in timestamp order, so walk back from the
+    # newest and stop at the first one older than the cutoff
+    i = len(entries)
+    while i and entries[i - 1].get("timestamp", "") >= cutoff_iso:
+        i -= 1
+    return entries[i:]
+
+
+def _compress_archive(rotated_path: str, archive_path: str) -> None:
+    """Gzip a rotated log off the write path, then remove the original."""
+    try:
+        with open(rotated_path, "rb") as f_in:
+            with gzip.open(archive_path, "wb", compresslevel=1) as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        os.remove(rotated_path)
+        logger.info(f"[PERF] Rotated log to {archive_path}")
+    except Exception as e:
+        logger.error(f"[PERF] Failed to compress rotated log {rotated_path}: {e}")
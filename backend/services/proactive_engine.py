@@ -6,14 +6,55 @@ the agent registry to generate proactive insights and recommendations.
 Runs on a configurable schedule (default: every 6 hours).
 """
 
+import asyncio
+import heapq
 import json
 import logging
+import os
 import re
+import tempfile
 from collections import Counter
+from itertools import chain, islice
+from operator import itemgetter
 from datetime import datetime, timedelta, timezone
 
+import orjson
+
+from services.performance_logger import PerformanceLogger
+from services.registry import get_active_agents
+from services.self_improvement import SelfImprovementService
+from services.settings import load_settings
+
 logger = logging.getLogger(__name__)
 
+# Words that never make a phrase meaningful on their own
+_STOPWORDS = frozenset({
+    "the", "a", "an", "is", "are", "was", "were", "be", "been",
+    "being", "have", "has", "had", "do", "does", "did", "will",
+    "would", "could", "should", "may", "might", "shall", "can",
+    "to", "of", "in", "for", "on", "with", "at", "by", "from",
+    "as", "into", "through", "during", "before", "after", "above",
+    "below", "between", "and", "but", "or", "not", "so", "if",
+    "this", "that", "these", "those", "it", "its", "my", "your",
+    "his", "her", "our", "their", "what", "which", "who", "whom",
+    "when", "where", "why", "how", "all", "each", "every", "both",
+    "i", "you", "he", "she", "we", "they", "me", "him", "us",
+    "them", "please", "thanks", "thank", "just", "also", "like",
+    "get", "make", "know", "think", "want", "need", "use", "try",
+})
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Words per message considered for n-gram pattern mining
+_MAX_WORDS_PER_MESSAGE = 500
+# How often (in messages) the usage scan checks whether it can stop early
+_EARLY_EXIT_CHECK_EVERY = 25
+# Headless Clyde sessions allowed to rewrite insight descriptions at once
+_MAX_CONCURRENT_REWRITES = 3
+# How long a Clyde rewrite is reused, and how many are kept on disk
+_REWRITE_CACHE_TTL = timedelta(days=7)
+_REWRITE_CACHE_MAX_ENTRIES = 200
+
 
 class ProactiveEngine:
     """Analyses system data and generates proactive insights."""
@@ -25,50 +66,63 @@ class ProactiveEngine:
         """Execute all analysis passes and return new insights."""
         logger.info("[ProactiveEngine] Starting analysis run")
 
-        all_insights: list[dict] = []
-
+        # The usage and workflow passes read the same recent messages, so
+        # fetch them once; on failure each pass falls back to its own fetch
+        messages: list[dict] | None
         try:
-            # Run all analysis passes
-            usage_insights = await self._analyse_usage_patterns()
-            all_insights.extend(usage_insights)
+            messages = await self._fetch_recent_messages()
         except Exception as e:
-            logger.error(f"[ProactiveEngine] Usage pattern analysis failed: {e}")
-
-        try:
-            health_insights = await self._analyse_agent_health()
-            all_insights.extend(health_insights)
-        except Exception as e:
-            logger.error(f"[ProactiveEngine] Agent health analysis failed: {e}")
+            logger.warning(f"[ProactiveEngine] Failed to fetch recent messages: {e}")
+            messages = None
+
+        # The passes are independent and mostly waiting on Supabase/OpenAI,
+        # so run them concurrently; one failing doesn't sink the others
+        passes = (
+            ("Usage pattern", self._analyse_usage_patterns(messages)),
+            ("Agent health", self._analyse_agent_health()),
+            ("Workflow", self._analyse_workflow_opportunities(messages)),
+        )
+        results = await asyncio.gather(
+            *(coro for _, coro in passes), return_exceptions=True
+        )
 
-        try:
-            workflow_insights = await self._analyse_workflow_opportunities()
-            all_insights.extend(workflow_insights)
-        except Exception as e:
-            logger.error(f"[ProactiveEngine] Workflow analysis failed: {e}")
+        all_insights: list[dict] = []
+        for (label, _), result in zip(passes, results):
+            if isinstance(result, Exception):
+                logger.error(f"[ProactiveEngine] {label} analysis failed: {result}")
+            else:
+                all_insights.extend(result)
 
         # Deduplicate against recent existing insights
         deduped = await self._deduplicate_insights(all_insights)
+        if not deduped:
+            # Quiet run: nothing to rewrite or save
+            logger.info(
+                f"[ProactiveEngine] Analysis complete: "
+                f"{len(all_insights)} raw → 0 deduped → 0 saved"
+            )
+            return []
 
         # Optionally enhance descriptions with headless Clyde
         enhanced = await self._enhance_with_clyde(deduped)
 
-        # Persist each insight to Supabase
+        # Persist all insights to Supabase in one insert
         saved: list[dict] = []
-        for insight in enhanced:
-            try:
-                from services.supabase_client import save_insight
-
-                result = await save_insight(
-                    insight_type=insight["insight_type"],
-                    title=insight["title"],
-                    description=insight["description"],
-                    severity=insight.get("severity", "info"),
-                    data=insight.get("data", {}),
-                )
-                if result:
-                    saved.append(result)
-            except Exception as e:
-                logger.error(f"[ProactiveEngine] Failed to save insight: {e}")
+        try:
+            from services.supabase_client import save_insights_bulk
+
+            saved = await save_insights_bulk([
+                {
+                    "insight_type": insight["insight_type"],
+                    "title": insight["title"],
+                    "description": insight["description"],
+                    "severity": insight.get("severity", "info"),
+                    "data": insight.get("data") or {},
+                }
+                for insight in enhanced
+            ])
+        except Exception as e:
+            logger.error(f"[ProactiveEngine] Failed to save insights: {e}")
 
         logger.info(
             f"[ProactiveEngine] Analysis complete: "
@@ -78,43 +132,92 @@ class ProactiveEngine:
 
     # ─── Usage Pattern Analysis ─────────────────────────────────
 
-    async def _analyse_usage_patterns(self) -> list[dict]:
-        """Detect recurring task types in recent user messages."""
+    async def _fetch_recent_messages(self) -> list[dict]:
+        """Last 14 days of user messages (newest first), shared by the analysers."""
         from services.supabase_client import get_recent_message_contents
 
-        messages = await get_recent_message_contents(days=14, limit=200)
+        return await get_recent_message_contents(days=14, limit=200, columns="content")
+
+    async def _analyse_usage_patterns(
+        self, messages: list[dict] | None = None
+    ) -> list[dict]:
+        """Detect recurring task types in recent user messages."""
+        if messages is None:
+            messages = await self._fetch_recent_messages()
         if not messages:
             return []
 
-        # Extract meaningful phrases from user messages
-        phrase_counter: Counter[str] = Counter()
-        for msg in messages:
+        active_agents = get_active_agents(self.working_dir)
+        agent_roles = [a.get("role", "").lower() for a in active_agents]
+        # One substring search over all roles at once ("\n" never occurs in a
+        # phrase), and roles sorted by length so only those short enough to
+        # fit inside the phrase are tried the other way round
+        roles_blob = "\n".join(agent_roles)
+        roles_by_len = sorted(agent_roles, key=len)
+
+        def matches_role(phrase: str) -> bool:
+            if phrase in roles_blob:
+                return True
+            for role in roles_by_len:
+                if len(role) > len(phrase):
+                    return False
+                if role in phrase:
+                    return True
+            return False
+
+        # Count bigrams and trigrams from user messages as word tuples
+        phrase_counter: Counter[tuple[str, ...]] = Counter()
+        seen_contents: set[str] = set()
+        for i, msg in enumerate(messages, 1):
+            # Deliberate approximation: once five meaningful, frequent phrases
+            # that no existing agent covers have emerged, stop scanning. The
+            # unread messages could still reorder the top five and would
+            # raise the reported counts; we trade that for bounded work.
+            if i % _EARLY_EXIT_CHECK_EVERY == 0 and sum(
+                1 for words, count in phrase_counter.most_common(10)
+                if count >= 5
+                and self._is_meaningful_phrase(words)
+                and not matches_role(" ".join(words))
+            ) >= 5:
+                break
             content = (msg.get("content") or "").lower().strip()
             if len(content) < 10:
                 continue
-            # Extract bigrams and trigrams from content
-            words = re.findall(r"[a-z]+", content)
-            for n in (2, 3):
-                for i in range(len(words) - n + 1):
-                    phrase = " ".join(words[i : i + n])
-                    # Filter out very common/useless phrases
-                    if self._is_meaningful_phrase(phrase):
-                        phrase_counter[phrase] += 1
+            # A resent or re-pasted prompt is one intent, not several
+            if content in seen_contents:
+                continue
+            seen_contents.add(content)
+            # Only the opening words: a pasted log or file adds noise, not
+            # intent, and would otherwise dominate the counts
+            words = [
+                m.group()
+                for m in islice(_WORD_RE.finditer(content), _MAX_WORDS_PER_MESSAGE)
+            ]
+            phrase_counter.update(chain(
+                zip(words, words[1:]),
+                zip(words, words[1:], words[2:]),
+            ))
+
+        # Filter out very common/useless phrases once per distinct phrase,
+        # then take the top 5 as most_common(5) would
+        top_phrases = heapq.nlargest(
+            5,
+            (
+                (phrase, count) for phrase, count in phrase_counter.items()
+                if self._is_meaningful_phrase(phrase)
+            ),
+            key=itemgetter(1),
+        )
 
         # Find patterns that appear 5+ times
         insights: list[dict] = []
-        from services.registry import get_active_agents
-
-        active_agents = get_active_agents(self.working_dir)
-        agent_roles = [a.get("role", "").lower() for a in active_agents]
-
-        for phrase, count in phrase_counter.most_common(5):
+        for words, count in top_phrases:
             if count < 5:
                 continue
+            phrase = " ".join(words)
 
             # Check if a matching agent already exists
-            has_match = any(phrase in role or role in phrase for role in agent_roles)
-            if has_match:
+            if matches_role(phrase):
                 continue
 
             insights.append({
@@ -135,28 +238,13 @@ class ProactiveEngine:
 
         return insights[:3]  # Cap at 3 suggestions per run
 
-    def _is_meaningful_phrase(self, phrase: str) -> bool:
+    def _is_meaningful_phrase(self, words: tuple[str, ...]) -> bool:
         """Filter out common/useless bigrams and trigrams."""
-        stopwords = {
-            "the", "a", "an", "is", "are", "was", "were", "be", "been",
-            "being", "have", "has", "had", "do", "does", "did", "will",
-            "would", "could", "should", "may", "might", "shall", "can",
-            "to", "of", "in", "for", "on", "with", "at", "by", "from",
-            "as", "into", "through", "during", "before", "after", "above",
-            "below", "between", "and", "but", "or", "not", "so", "if",
-            "this", "that", "these", "those", "it", "its", "my", "your",
-            "his", "her", "our", "their", "what", "which", "who", "whom",
-            "when", "where", "why", "how", "all", "each", "every", "both",
-            "i", "you", "he", "she", "we", "they", "me", "him", "us",
-            "them", "please", "thanks", "thank", "just", "also", "like",
-            "get", "make", "know", "think", "want", "need", "use", "try",
-        }
-        words = phrase.split()
         # Skip if all words are stopwords
-        if all(w in stopwords for w in words):
+        if _STOPWORDS.issuperset(words):
             return False
-        # Skip very short phrases
-        if len(phrase) < 6:
+        # Skip very short phrases (joined length, spaces included)
+        if sum(map(len, words)) + len(words) - 1 < 6:
             return False
         return True
 
@@ -164,8 +252,6 @@ class ProactiveEngine:
 
     async def _analyse_agent_health(self) -> list[dict]:
         """Check agent utilisation, performance trends, idle agents."""
-        from services.performance_logger import PerformanceLogger
-        from services.self_improvement import SelfImprovementService
         from services.supabase_client import get_recently_active_agents
 
         perf_logger = PerformanceLogger(self.working_dir)
@@ -227,8 +313,12 @@ class ProactiveEngine:
 
         # Also detect positive trends — agents that have improved
         try:
-            all_stats = perf_logger.get_all_stats(days=30)
-            recent_stats = perf_logger.get_all_stats(days=7)
+            windows = perf_logger.get_stats_windows([7, 30])
+            all_stats = windows[30]
+            recent_stats = windows[7]
+            recent_by_name = {
+                a.get("agent_name"): a for a in recent_stats.get("by_agent", [])
+            }
 
             for agent_30 in all_stats.get("by_agent", []):
                 name = agent_30.get("agent_name")
@@ -239,11 +329,7 @@ class ProactiveEngine:
                     continue  # Not enough data for trend
 
                 # Find the same agent in 7-day stats
-                agent_7 = next(
-                    (a for a in recent_stats.get("by_agent", [])
-                     if a.get("agent_name") == name),
-                    None,
-                )
+                agent_7 = recent_by_name.get(name)
                 if not agent_7 or agent_7.get("tasks", 0) < 3:
                     continue
 
@@ -276,7 +362,9 @@ class ProactiveEngine:
 
     # ─── Workflow Opportunity Analysis ──────────────────────────
 
-    async def _analyse_workflow_opportunities(self) -> list[dict]:
+    async def _analyse_workflow_opportunities(
+        self, messages: list[dict] | None = None
+    ) -> list[dict]:
         """Detect potential workflow optimisations via semantic clustering."""
         try:
             from services.embeddings import generate_query_embedding
@@ -286,9 +374,9 @@ class ProactiveEngine:
             return []
 
         # Use the top phrases from usage patterns to find semantic clusters
-        from services.supabase_client import get_recent_message_contents
-
-        messages = await get_recent_message_contents(days=14, limit=100)
+        if messages is None:
+            messages = await self._fetch_recent_messages()
+        messages = messages[:100]
         if len(messages) < 10:
             return []
 
@@ -299,49 +387,56 @@ class ProactiveEngine:
             if len(m.get("content", "")) > 20
         ][:3]
 
+        async def run_probe(probe: str) -> list[dict]:
+            embedding = await generate_query_embedding(probe[:500])
+            return await search_messages(
+                query_embedding=embedding,
+                threshold=0.5,
+                limit=10,
+            )
+
+        # Probes are independent round-trips; run them together and judge
+        # the results in probe order afterwards
+        probe_results = await asyncio.gather(
+            *(run_probe(p) for p in probe_messages), return_exceptions=True
+        )
+
         insights: list[dict] = []
         seen_patterns: set[str] = set()
 
-        for probe in probe_messages:
-            try:
-                embedding = await generate_query_embedding(probe[:500])
-                results = await search_messages(
-                    query_embedding=embedding,
-                    threshold=0.5,
-                    limit=10,
+        for probe, results in zip(probe_messages, probe_results):
+            if isinstance(results, Exception):
+                logger.warning(f"[ProactiveEngine] Semantic probe failed: {results}")
+                continue
+
+            if len(results) >= 5:
+                # Found a cluster of similar requests
+                unique_sessions = set(
+                    r.get("session_id") for r in results
                 )
+                if len(unique_sessions) >= 2:
+                    # Pattern spans multiple sessions — worth suggesting
+                    snippet = probe[:60].strip()
+                    if snippet in seen_patterns:
+                        continue
+                    seen_patterns.add(snippet)
 
-                if len(results) >= 5:
-                    # Found a cluster of similar requests
-                    unique_sessions = set(
-                        r.get("session_id") for r in results
-                    )
-                    if len(unique_sessions) >= 2:
-                        # Pattern spans multiple sessions — worth suggesting
-                        snippet = probe[:60].strip()
-                        if snippet in seen_patterns:
-                            continue
-                        seen_patterns.add(snippet)
-
-                        insights.append({
-                            "insight_type": "workflow_optimisation",
-                            "title": "Recurring workflow detected",
-                            "description": (
-                                f"Found {len(results)} similar requests "
-                                f"across {len(unique_sessions)} sessions "
-                                f"related to: \"{snippet}...\". Consider "
-                                f"creating a skill document or scheduled task."
-                            ),
-                            "severity": "info",
-                            "data": {
-                                "probe_text": probe[:200],
-                                "match_count": len(results),
-                                "session_count": len(unique_sessions),
-                            },
-                        })
-            except Exception as e:
-                logger.warning(f"[ProactiveEngine] Semantic probe failed: {e}")
-                continue
+                    insights.append({
+                        "insight_type": "workflow_optimisation",
+                        "title": "Recurring workflow detected",
+                        "description": (
+                            f"Found {len(results)} similar requests "
+                            f"across {len(unique_sessions)} sessions "
+                            f"related to: \"{snippet}...\". Consider "
+                            f"creating a skill document or scheduled task."
+                        ),
+                        "severity": "info",
+                        "data": {
+                            "probe_text": probe[:200],
+                            "match_count": len(results),
+                            "session_count": len(unique_sessions),
+                        },
+                    })
 
         return insights[:2]  # Cap at 2 workflow suggestions per run
 
@@ -349,19 +444,17 @@ class ProactiveEngine:
 
     async def _deduplicate_insights(self, new_insights: list[dict]) -> list[dict]:
         """Remove insights that duplicate recent existing ones."""
-        from services.supabase_client import get_all_insights
+        from services.supabase_client import get_recent_insight_keys
+
+        if not new_insights:
+            return []
 
-        existing = await get_all_insights(limit=50)
-        cutoff = (datetime.now(timezone.utc) - timedelta(hours=48)).isoformat()
+        since = (datetime.now(timezone.utc) - timedelta(hours=48)).isoformat()
+        types = list({i["insight_type"] for i in new_insights})
+        existing = await get_recent_insight_keys(since, types)
 
         # Build set of recent (type, key_data) tuples
-        recent_keys: set[str] = set()
-        for ex in existing:
-            created = ex.get("created_at", "")
-            if created < cutoff:
-                continue
-            key = self._insight_dedup_key(ex)
-            recent_keys.add(key)
+        recent_keys: set[tuple[str, str, str]] = {self._insight_dedup_key(ex) for ex in existing}
 
         deduped: list[dict] = []
         for insight in new_insights:
@@ -372,21 +465,19 @@ class ProactiveEngine:
 
         return deduped
 
-    def _insight_dedup_key(self, insight: dict) -> str:
+    def _insight_dedup_key(self, insight: dict) -> tuple[str, str, str]:
         """Generate a deduplication key from an insight."""
         itype = insight.get("insight_type", "")
         data = insight.get("data", {})
         # Use agent_name or pattern as the distinguishing key
         agent = data.get("agent_name", "")
         pattern = data.get("pattern", "")
-        return f"{itype}:{agent}:{pattern}"
+        return (itype, agent, pattern)
 
     # ─── Optional: Enhance with Headless Clyde ──────────────────
 
     async def _enhance_with_clyde(self, insights: list[dict]) -> list[dict]:
         """Optionally use a headless Clyde session to rewrite insight descriptions."""
-        from services.settings import load_settings
-
         settings = load_settings(self.working_dir)
         proactive_enabled = settings.get("proactive_mode_enabled", True)
 
@@ -398,40 +489,131 @@ class ProactiveEngine:
         if not to_enhance:
             return insights
 
-        try:
-            from agents.clyde import ClydeChatManager
-
-            manager = ClydeChatManager(working_dir=self.working_dir, ws=None)
-            await manager.initialize()
-
-            for insight in to_enhance:
-                prompt = (
-                    f"You are writing a brief notification for the user. "
-                    f"Rewrite this insight in a natural, conversational tone "
-                    f"as if Clyde is speaking directly to the user. "
-                    f"Keep it to 1-2 sentences maximum.\n\n"
-                    f"Type: {insight['insight_type']}\n"
-                    f"Title: {insight['title']}\n"
-                    f"Raw description: {insight['description']}\n"
-                    f"Data: {json.dumps(insight.get('data', {}))}\n\n"
-                    f"Return ONLY the rewritten description, nothing else."
+        # Reuse recent rewrites of the same insight (same dedup key and the
+        # same template text) instead of asking Clyde again
+        cache = await asyncio.to_thread(self._load_rewrite_cache)
+        misses: list[dict] = []
+        for insight in to_enhance:
+            hit = cache.get(self._insight_dedup_key(insight))
+            if hit is not None and hit["source"] == insight["description"]:
+                insight["description"] = hit["description"]
+            else:
+                misses.append(insight)
+        if not misses:
+            return insights
+
+        # A manager holds one conversation, so each concurrent rewrite gets
+        # its own session, capped to keep the number of CLI processes small
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_REWRITES)
+
+        async def rewrite(insight: dict) -> None:
+            prompt = (
+                f"You are writing a brief notification for the user. "
+                f"Rewrite this insight in a natural, conversational tone "
+                f"as if Clyde is speaking directly to the user. "
+                f"Keep it to 1-2 sentences maximum.\n\n"
+                f"Type: {insight['insight_type']}\n"
+                f"Title: {insight['title']}\n"
+                f"Raw description: {insight['description']}\n"
+                f"Data: {json.dumps(insight.get('data', {}))}\n\n"
+                f"Return ONLY the rewritten description, nothing else."
+            )
+            response_text = ""
+            try:
+                from agents.clyde import ClydeChatManager
+
+                async with semaphore:
+                    manager = ClydeChatManager(working_dir=self.working_dir, ws=None)
+                    try:
+                        await manager.initialize()
+
+                        # The stream sends token deltas ("streaming") and then
+                        # each complete text block ("final"); only the final
+                        # blocks matter
+                        async for chunk in manager.send_message(prompt):
+                            if chunk.get("type") == "assistant_text":
+                                data = chunk.get("data", {})
+                                if data.get("final") and data.get("text"):
+                                    response_text = data["text"]
+                    finally:
+                        await manager.disconnect()
+            except Exception as e:
+                logger.warning(
+                    f"[ProactiveEngine] Headless Clyde enhancement failed: {e}"
                 )
+                # Fall through with the template description
+                return
 
-                response_text = ""
-                async for chunk in manager.send_message(prompt):
-                    if chunk.get("type") == "assistant_text":
-                        text = chunk.get("data", {}).get("text", "")
-                        if text:
-                            response_text = text
+            if response_text and len(response_text) > 10:
+                rewritten = response_text.strip()
+                cache[self._insight_dedup_key(insight)] = {
+                    "source": insight["description"],
+                    "description": rewritten,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                }
+                insight["description"] = rewritten
 
-                if response_text and len(response_text) > 10:
-                    insight["description"] = response_text.strip()
+        await asyncio.gather(*map(rewrite, misses))
 
-            await manager.disconnect()
+        try:
+            await asyncio.to_thread(self._save_rewrite_cache, cache)
         except Exception as e:
-            logger.warning(
-                f"[ProactiveEngine] Headless Clyde enhancement failed: {e}"
-            )
-            # Fall through with template descriptions
+            logger.warning(f"[ProactiveEngine] Failed to save rewrite cache: {e}")
 
         return insights
+
+    def _rewrite_cache_path(self) -> str:
+        return os.path.join(self.working_dir, "logs", "insight_rewrites.json")
+
+    def _load_rewrite_cache(self) -> dict[tuple[str, str, str], dict]:
+        """Load unexpired Clyde rewrites keyed by insight dedup key.
+
+        A missing or malformed cache file is treated as empty.
+        """
+        cutoff = (datetime.now(timezone.utc) - _REWRITE_CACHE_TTL).isoformat()
+        try:
+            with open(self._rewrite_cache_path(), "rb") as f:
+                entries = orjson.loads(f.read())
+            return {
+                tuple(e["key"]): {
+                    "source": e["source"],
+                    "description": e["description"],
+                    "created_at": e["created_at"],
+                }
+                for e in entries
+                if e["created_at"] >= cutoff
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def _save_rewrite_cache(self, cache: dict[tuple[str, str, str], dict]) -> None:
+        """Atomically persist the newest rewrites, bounded in count."""
+        newest = heapq.nlargest(
+            _REWRITE_CACHE_MAX_ENTRIES,
+            cache.items(),
+            key=lambda item: item[1]["created_at"],
+        )
+        data = orjson.dumps([
+            {
+                "key": list(key),
+                "source": entry["source"],
+                "description": entry["description"],
+                "created_at": entry["created_at"],
+            }
+            for key, entry in newest
+        ])
+        path = self._rewrite_cache_path()
+        dir_name = os.path.dirname(path)
+        os.makedirs(dir_name, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".json")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            # Clean up temp file on failure
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -5,19 +5,31 @@ Clyde (the orchestrator) is the only agent that modifies the registry,
 via custom MCP tools exposed through the Claude Agent SDK.
 """
 
-import json
 import os
 import random
+import stat
 import tempfile
-import time
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-# In-memory registry cache (TTL-based, invalidated on save)
-_registry_cache: dict[str, tuple[float, dict[str, Any]]] = {}
-_CACHE_TTL = 5.0  # seconds
+import orjson
+
+# In-memory registry cache keyed on the file's (mtime_ns, size) signature.
+# Each entry holds (sig, data, name_index, id_index).
+_registry_cache: dict[
+    str,
+    tuple[tuple[int, int], dict[str, Any], dict[str, dict[str, Any]], dict[str, dict[str, Any]]],
+] = {}
+
+# Avatar filenames per gender directory, keyed on the directory's mtime_ns
+_avatar_cache: dict[str, tuple[int, list[str]]] = {}
+
+
+def _file_sig(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
 
 
 def _registry_path(working_dir: str) -> str:
@@ -28,23 +40,50 @@ def _default_registry_path(working_dir: str) -> str:
     return os.path.join(working_dir, "registry.default.json")
 
 
-def load_registry(working_dir: str) -> dict[str, Any]:
-    """Read and parse registry.json with in-memory TTL cache.
+def _cache_entry(
+    path: str, sig: tuple[int, int], data: dict[str, Any]
+) -> tuple[tuple[int, int], dict[str, Any], dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+    """Build the cached value: the registry plus name (lowercased) and id lookups.
+
+    Agents are indexed in reverse and the orchestrator last, so the first
+    match in file order wins and Clyde shadows any same-named agent.
+    """
+    name_index: dict[str, dict[str, Any]] = {}
+    id_index: dict[str, dict[str, Any]] = {}
+    for agent in reversed(data.get("agents", [])):
+        name_index[agent["name"].lower()] = agent
+        id_index[agent["id"]] = agent
+
+    orchestrator = data.get("orchestrator", {})
+    if orchestrator.get("name"):
+        name_index[orchestrator["name"].lower()] = orchestrator
+    if orchestrator.get("id"):
+        id_index[orchestrator["id"]] = orchestrator
+
+    entry = (sig, data, name_index, id_index)
+    _registry_cache[path] = entry
+    return entry
+
+
+def _load_cached(working_dir: str):
+    """Return the cached (sig, data, name_index, id_index) entry, reloading if stale.
 
     If registry.json doesn't exist yet (e.g. fresh clone), copies from
     registry.default.json so the user gets the initial Clyde orchestrator.
     """
     path = _registry_path(working_dir)
-    now = time.monotonic()
+
+    try:
+        sig = _file_sig(path)
+    except FileNotFoundError:
+        sig = None
 
     cached = _registry_cache.get(path)
-    if cached is not None:
-        cached_time, cached_data = cached
-        if now - cached_time < _CACHE_TTL:
-            return cached_data
+    if cached is not None and sig is not None and cached[0] == sig:
+        return cached
 
     # Bootstrap: copy from tracked default template on first run
-    if not os.path.exists(path):
+    if sig is None:
         default_path = _default_registry_path(working_dir)
         if os.path.exists(default_path):
             import shutil
@@ -55,10 +94,17 @@ def load_registry(working_dir: str) -> dict[str, Any]:
                 "Ensure registry.default.json exists in the working directory."
             )
 
-    with open(path, "r") as f:
-        data = json.load(f)
-    _registry_cache[path] = (now, data)
-    return data
+        sig = _file_sig(path)
+
+    # sig is taken before the read, so a concurrent write only forces a reload
+    with open(path, "rb") as f:
+        data = orjson.loads(f.read())
+    return _cache_entry(path, sig, data)
+
+
+def load_registry(working_dir: str) -> dict[str, Any]:
+    """Read and parse registry.json, reusing the cached dict while the file is unchanged."""
+    return _load_cached(working_dir)[1]
 
 
 def save_registry(working_dir: str, data: dict[str, Any]) -> None:
@@ -67,10 +113,24 @@ def save_registry(working_dir: str, data: dict[str, Any]) -> None:
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
 
     dir_name = os.path.dirname(path)
-    fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".json")
+    # Compact by default; set CLYDE_PRETTY_REGISTRY to keep it hand-readable
+    option = orjson.OPT_APPEND_NEWLINE
+    if os.environ.get("CLYDE_PRETTY_REGISTRY"):
+        option |= orjson.OPT_INDENT_2
     try:
-        with os.fdopen(fd, "w") as f:
-            json.dump(data, f, indent=2)
+        payload = orjson.dumps(data, option=option)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".json")
+    except Exception:
+        # Callers mutate the cached dict before saving; drop it so the
+        # unsaved change isn't served until registry.json next changes
+        _registry_cache.pop(path, None)
+        raise
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            # Make the contents durable before the rename publishes them
+            f.flush()
+            os.fsync(f.fileno())
         os.replace(tmp_path, path)
     except Exception:
         # Clean up temp file on failure
@@ -78,10 +138,11 @@ def save_registry(working_dir: str, data: dict[str, Any]) -> None:
             os.unlink(tmp_path)
         except OSError:
             pass
+        _registry_cache.pop(path, None)
         raise
 
-    # Invalidate cache so next load_registry() picks up the fresh data
-    _registry_cache.pop(path, None)
+    # Seed the cache with what we just wrote so the next load skips the re-read
+    _cache_entry(path, _file_sig(path), data)
 
 
 def get_active_agents(working_dir: str) -> list[dict[str, Any]]:
@@ -92,33 +153,12 @@ def get_active_agents(working_dir: str) -> list[dict[str, Any]]:
 
 def get_agent_by_name(working_dir: str, name: str) -> dict[str, Any] | None:
     """Find an agent by name (case-insensitive). Also checks the orchestrator."""
-    registry = load_registry(working_dir)
-    name_lower = name.lower()
-
-    # Check orchestrator first (Clyde)
-    orchestrator = registry.get("orchestrator", {})
-    if orchestrator.get("name", "").lower() == name_lower:
-        return orchestrator
-
-    for agent in registry.get("agents", []):
-        if agent["name"].lower() == name_lower:
-            return agent
-    return None
+    return _load_cached(working_dir)[2].get(name.lower())
 
 
 def get_agent_by_id(working_dir: str, registry_id: str) -> dict[str, Any] | None:
     """Find an agent by registry ID. Also checks the orchestrator."""
-    registry = load_registry(working_dir)
-
-    # Check orchestrator first (Clyde)
-    orchestrator = registry.get("orchestrator", {})
-    if orchestrator.get("id") == registry_id:
-        return orchestrator
-
-    for agent in registry.get("agents", []):
-        if agent["id"] == registry_id:
-            return agent
-    return None
+    return _load_cached(working_dir)[3].get(registry_id)
 
 
 def create_agent(
@@ -154,7 +194,7 @@ def create_agent(
 
     # Select avatar if not provided
     if not avatar:
-        avatar = select_random_avatar(working_dir, gender)
+        avatar = select_random_avatar(working_dir, gender, registry)
 
     # System prompt path
     prompt_filename = f"{name.lower()}-system.md"
@@ -231,9 +271,12 @@ def archive_agent(working_dir: str, registry_id: str) -> dict[str, Any]:
     return update_agent(working_dir, registry_id, {"status": "archived"})
 
 
-def get_used_avatars(working_dir: str) -> set[str]:
+def get_used_avatars(
+    working_dir: str, registry: dict[str, Any] | None = None
+) -> set[str]:
     """Collect all avatar paths currently in use by active/paused agents."""
-    registry = load_registry(working_dir)
+    if registry is None:
+        registry = load_registry(working_dir)
     used = set()
 
     # Orchestrator avatar
@@ -249,7 +292,9 @@ def get_used_avatars(working_dir: str) -> set[str]:
     return used
 
 
-def select_random_avatar(working_dir: str, gender: str = "male") -> str | None:
+def select_random_avatar(
+    working_dir: str, gender: str = "male", registry: dict[str, Any] | None = None
+) -> str | None:
     """
     Scan frontend/public/avatars/{gender}/ for .jpeg files,
     find ones not already assigned, and return a random unused avatar path.
@@ -259,21 +304,31 @@ def select_random_avatar(working_dir: str, gender: str = "male") -> str | None:
     project_root = os.path.dirname(working_dir)
     avatars_dir = os.path.join(project_root, "frontend", "public", "avatars", gender)
 
-    if not os.path.isdir(avatars_dir):
+    try:
+        st = os.stat(avatars_dir)
+    except OSError:
         return None
-
-    # Find all jpeg files
-    available = []
-    for filename in os.listdir(avatars_dir):
-        if filename.lower().endswith((".jpeg", ".jpg", ".png")):
-            avatar_path = f"/avatars/{gender}/{filename}"
-            available.append(avatar_path)
+    if not stat.S_ISDIR(st.st_mode):
+        return None
+    dir_mtime = st.st_mtime_ns
+
+    # Find all image files (rescan only when the directory changes)
+    cached = _avatar_cache.get(avatars_dir)
+    if cached is not None and cached[0] == dir_mtime:
+        available = cached[1]
+    else:
+        available = [
+            f"/avatars/{gender}/{filename}"
+            for filename in os.listdir(avatars_dir)
+            if filename.lower().endswith((".jpeg", ".jpg", ".png"))
+        ]
+        _avatar_cache[avatars_dir] = (dir_mtime, available)
 
     if not available:
         return None
 
     # Filter out already-used avatars
-    used = get_used_avatars(working_dir)
+    used = get_used_avatars(working_dir, registry)
     unused = [a for a in available if a not in used]
 
     if not unused:
@@ -15,46 +15,179 @@ import json
 import logging
 import os
 import random
+import tempfile
+import threading
+from collections.abc import Sequence
 from datetime import datetime, timezone
+from pathlib import Path
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
+from claude_agent_sdk import (
+    AgentDefinition,
+    AssistantMessage,
+    ClaudeAgentOptions,
+    ClaudeSDKClient,
+    ResultMessage,
+    TextBlock,
+)
+
+from agents.clyde import _AUTO_ALLOW_TOOLS
+from agents.tools import init_tools, registry_mcp_server
+from services.embeddings import generate_embedding
+from services.registry import load_registry
+from services.supabase_client import create_session, save_message
 
 logger = logging.getLogger(__name__)
 
+# Coalesce run bookkeeping (last_run / run_count) into one write of
+# schedules.json; CRUD changes are written immediately
+_SAVE_DEBOUNCE_SECONDS = 0.1
+
+# Tools every scheduled run may use: the built-ins plus the registry MCP
+# tools, both bare and server-prefixed
+_BUILTIN_TOOLS = (
+    "Read", "Edit", "Write", "Bash", "Glob", "Grep",
+    "WebSearch", "WebFetch", "Task",
+)
+_BASE_ALLOWED_TOOLS = tuple(dict.fromkeys((
+    *_BUILTIN_TOOLS,
+    *_AUTO_ALLOW_TOOLS,
+    *(f"mcp__registry_tools__{t}" for t in _AUTO_ALLOW_TOOLS),
+)))
+
+# Prompt, memory and skill file contents keyed on (st_mtime_ns, st_size), so
+# a fire that finds them unchanged does one stat per file instead of a read
+_file_cache: dict[str, tuple[tuple[int, int], str]] = {}
+
+
+def _read_cached(path: str) -> str | None:
+    """Return a text file's contents, re-reading only when it changed; None if missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    sig = (st.st_mtime_ns, st.st_size)
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+    try:
+        with open(path, "r") as f:
+            content = f.read()
+    except FileNotFoundError:
+        # Removed between the stat and the open
+        _file_cache.pop(path, None)
+        return None
+    _file_cache[path] = (sig, content)
+    return content
+
+
+def _format_skills(skill_names: Sequence[str], docs: Sequence[str | None]) -> str:
+    """Join skill documents into "### name" sections, skipping missing or empty ones."""
+    sections = []
+    for skill_name, doc in zip(skill_names, docs):
+        content = (doc or "").strip()
+        if content:
+            sections.append(f"### {skill_name}\n\n{content}")
+    return "\n\n".join(sections) if sections else ""
+
 
 class TaskScheduler:
     """Cron-based task scheduler that triggers headless Clyde sessions."""
 
     def __init__(self, working_dir: str):
         self.working_dir = working_dir
+        self._abs_working = str(Path(working_dir).resolve())
         self.scheduler = AsyncIOScheduler()
         self._schedules: list[dict] = []
         self._schedules_path = os.path.join(working_dir, "schedules.json")
+        self._save_handle: asyncio.TimerHandle | None = None
+        self._save_task: asyncio.Task | None = None
+        # Snapshots are numbered so a slow threaded write never lands over a
+        # newer synchronous one
+        self._write_lock = threading.Lock()
+        self._save_seq = 0
+        self._written_seq = 0
+        # allowed_tools only depends on the registry, so keep it per registry.json signature
+        self._allowed_tools_cache: tuple[tuple[int, int], list[str]] | None = None
+        # Orchestrator skill names, re-read only when registry.json changes
+        self._orchestrator_skills: tuple[tuple[int, int], tuple[str, ...]] | None = None
+        # Assembled Clyde system prompt, keyed on its input file contents
+        self._system_prompt_cache: tuple[tuple, str] | None = None
         self._load_schedules()
 
     # ─── Persistence ──────────────────────────────────────────
 
     def _load_schedules(self) -> None:
         """Load schedules from JSON file."""
-        if os.path.exists(self._schedules_path):
-            try:
-                with open(self._schedules_path, "r") as f:
-                    data = json.load(f)
-                self._schedules = data.get("schedules", [])
-                logger.info(f"[SCHEDULER] Loaded {len(self._schedules)} schedules")
-            except Exception as e:
-                logger.error(f"[SCHEDULER] Failed to load schedules: {e}")
-                self._schedules = []
-        else:
+        try:
+            with open(self._schedules_path, "r") as f:
+                data = json.load(f)
+            self._schedules = data.get("schedules", [])
+            logger.info(f"[SCHEDULER] Loaded {len(self._schedules)} schedules")
+        except FileNotFoundError:
+            self._schedules = []
+        except Exception as e:
+            logger.error(f"[SCHEDULER] Failed to load schedules: {e}")
             self._schedules = []
 
+    def _serialize_schedules(self) -> str:
+        return json.dumps({"schedules": self._schedules}, indent=2, default=str)
+
+    def _write_schedules(self, data: str) -> None:
+        """Atomically write schedules.json (write to tmp, then rename)."""
+        dir_name = os.path.dirname(self._schedules_path)
+        os.makedirs(dir_name, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self._schedules_path)
+        except Exception:
+            # Clean up temp file on failure
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _write_snapshot(self, seq: int, data: str) -> None:
+        """Write a numbered snapshot unless a newer one is already on disk."""
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            self._write_schedules(data)
+            self._written_seq = seq
+
+    def _snapshot(self) -> tuple[int, str]:
+        self._save_seq += 1
+        return self._save_seq, self._serialize_schedules()
+
     def _save_schedules(self) -> None:
-        """Persist schedules to JSON file."""
-        os.makedirs(os.path.dirname(self._schedules_path), exist_ok=True)
-        with open(self._schedules_path, "w") as f:
-            json.dump({"schedules": self._schedules}, f, indent=2, default=str)
+        """Persist schedules now, superseding any pending debounced save."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        self._write_snapshot(*self._snapshot())
+
+    def _schedule_save(self) -> None:
+        """Debounce a save for frequent, non-critical updates like run_count."""
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                _SAVE_DEBOUNCE_SECONDS, self._flush_save
+            )
+
+    def _flush_save(self) -> None:
+        """Snapshot the schedules now and write them in a worker thread."""
+        self._save_handle = None
+        self._save_task = asyncio.ensure_future(self._write_in_thread(*self._snapshot()))
+
+    async def _write_in_thread(self, seq: int, data: str) -> None:
+        try:
+            await asyncio.to_thread(self._write_snapshot, seq, data)
+        except Exception as e:
+            logger.error(f"[SCHEDULER] Failed to save schedules: {e}")
 
     # ─── CRUD ─────────────────────────────────────────────────
 
@@ -164,9 +297,9 @@ class TaskScheduler:
             self.working_dir,
             prompt_rel_path.replace("/working/", "", 1),
         )
-        if os.path.exists(abs_path):
-            with open(abs_path, "r") as f:
-                return f.read()
+        content = _read_cached(abs_path)
+        if content is not None:
+            return content
         return f"System prompt not found at {prompt_rel_path}"
 
     def _load_agent_memory(self, memory_rel_path: str) -> str:
@@ -177,38 +310,28 @@ class TaskScheduler:
             self.working_dir,
             memory_rel_path.replace("/working/", "", 1),
         )
-        if os.path.exists(abs_path):
-            with open(abs_path, "r") as f:
-                content = f.read().strip()
-            if content:
-                return content
+        content = _read_cached(abs_path)
+        if content:
+            return content.strip()
         return ""
 
+    def _skill_path(self, skill_name: str) -> str:
+        filename = f"{skill_name}.md" if not skill_name.endswith(".md") else skill_name
+        return os.path.join(self.working_dir, "skills", filename)
+
     def _load_skills(self, skill_names: list[str]) -> str:
         """Load all assigned skill documents for an agent."""
         if not skill_names:
             return ""
-        skills_dir = os.path.join(self.working_dir, "skills")
-        sections = []
-        for skill_name in skill_names:
-            filename = f"{skill_name}.md" if not skill_name.endswith(".md") else skill_name
-            filepath = os.path.join(skills_dir, filename)
-            if os.path.exists(filepath):
-                with open(filepath, "r") as f:
-                    content = f.read().strip()
-                if content:
-                    sections.append(f"### {skill_name}\n\n{content}")
-        return "\n\n".join(sections) if sections else ""
+        return _format_skills(
+            skill_names, [_read_cached(self._skill_path(n)) for n in skill_names]
+        )
 
     def _build_agent_definitions(self) -> dict:
         """Load active agents from registry and build SDK AgentDefinition objects.
 
         Injects agent memory and assigned skills into each agent's system prompt.
         """
-        from pathlib import Path
-        from claude_agent_sdk import AgentDefinition
-        from services.registry import load_registry
-
         try:
             registry = load_registry(self.working_dir)
         except Exception:
@@ -217,12 +340,12 @@ class TaskScheduler:
         agents: dict[str, AgentDefinition] = {}
         for agent in registry.get("agents", []):
             if agent.get("status") == "active":
-                prompt = self._load_agent_prompt(agent.get("system_prompt_path", ""))
+                parts = [self._load_agent_prompt(agent.get("system_prompt_path", ""))]
 
                 # Inject accumulated memory
                 memory_content = self._load_agent_memory(agent.get("memory_path", ""))
                 if memory_content:
-                    prompt += (
+                    parts.append(
                         "\n\n## Your Memory (Accumulated Knowledge)\n\n"
                         "The following is your accumulated knowledge from previous tasks. "
                         "Use this context to inform your current work.\n\n"
@@ -232,7 +355,7 @@ class TaskScheduler:
                 # Inject assigned skills
                 skills_content = self._load_skills(agent.get("skills", []))
                 if skills_content:
-                    prompt += (
+                    parts.append(
                         "\n\n## Assigned Skills\n\n"
                         "The following skills have been assigned to you. Follow these "
                         "documented processes when relevant to your tasks.\n\n"
@@ -240,11 +363,10 @@ class TaskScheduler:
                     )
 
                 # Inject file boundary rule
-                abs_working = str(Path(self.working_dir).resolve())
-                prompt += (
+                parts.append(
                     "\n\n## File Access Rules\n\n"
                     "**CRITICAL**: You may ONLY read, write, and create files within "
-                    f"the working directory: `{abs_working}`\n\n"
+                    f"the working directory: `{self._abs_working}`\n\n"
                     "- ALL file paths MUST be within this directory.\n"
                     "- NEVER use paths starting with `~/`, `/Users/`, `/home/`, `/tmp/`, "
                     "or any path outside the working directory.\n"
@@ -252,13 +374,89 @@ class TaskScheduler:
 
                 agents[agent["name"].lower()] = AgentDefinition(
                     description=agent.get("role", "Specialist agent"),
-                    prompt=prompt,
+                    prompt="".join(parts),
                     tools=agent.get("tools"),
                     model=agent.get("model", "sonnet"),
                 )
 
         return agents
 
+    def _compute_system_prompt(self) -> str:
+        """Clyde's system prompt for a scheduled run, reassembled only when an input changes."""
+        prompt_path = os.path.join(self.working_dir, "prompts", "clyde-system.md")
+        base = _read_cached(prompt_path)
+        if base is None:
+            raise FileNotFoundError(f"Clyde system prompt not found at {prompt_path}")
+
+        sig = self._registry_sig()
+        cached_skills = self._orchestrator_skills
+        if cached_skills is not None and sig is not None and cached_skills[0] == sig:
+            skill_names = cached_skills[1]
+        else:
+            try:
+                registry = load_registry(self.working_dir)
+                skill_names = tuple(registry.get("orchestrator", {}).get("skills", []))
+            except Exception:
+                skill_names = ()
+            if sig is not None:
+                self._orchestrator_skills = (sig, skill_names)
+        skill_docs = tuple(_read_cached(self._skill_path(n)) for n in skill_names)
+
+        # _read_cached hands back the same str objects while the files are
+        # unchanged, so on the hot path this comparison is identity checks
+        key = (base, sig, skill_names, skill_docs)
+        cached = self._system_prompt_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        parts = [base]
+        parts.append(
+            "\n\n## Working Directory\n\n"
+            f"Your working directory is: `{self._abs_working}`\n\n"
+            "All file operations (Read, Write, Edit, Glob, Grep) MUST use paths within "
+            "this directory.\n"
+        )
+
+        # Inject orchestrator skills into system prompt
+        skills_content = _format_skills(skill_names, skill_docs)
+        if skills_content:
+            parts.append(
+                "\n\n## Your Assigned Skills\n\n"
+                "The following skills have been assigned to you. Follow these "
+                "documented processes when relevant to your tasks.\n\n"
+                f"{skills_content}"
+            )
+
+        system_prompt = "".join(parts)
+        self._system_prompt_cache = (key, system_prompt)
+        return system_prompt
+
+    def _registry_sig(self) -> tuple[int, int] | None:
+        """(mtime_ns, size) of registry.json, or None if it can't be stat'd."""
+        try:
+            st = os.stat(os.path.join(self.working_dir, "registry.json"))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _allowed_tools(self, agents: dict) -> list[str]:
+        """Top-level allowed_tools: the base set plus every tool declared on a subagent."""
+        sig = self._registry_sig()
+        cached = self._allowed_tools_cache
+        if cached is not None and sig is not None and cached[0] == sig:
+            return cached[1]
+
+        # Collect tools declared on subagents so they're whitelisted at top level
+        subagent_tools: set[str] = set()
+        for agent_def in agents.values():
+            if agent_def.tools:
+                subagent_tools.update(agent_def.tools)
+
+        allowed = [*_BASE_ALLOWED_TOOLS, *sorted(subagent_tools.difference(_BASE_ALLOWED_TOOLS))]
+        if sig is not None:
+            self._allowed_tools_cache = (sig, allowed)
+        return allowed
+
     # ─── Job Registration ─────────────────────────────────────
 
     def _register_job(self, schedule: dict) -> None:
@@ -298,20 +496,6 @@ class TaskScheduler:
         and no hooks (headless). If the stream dies mid-execution, the partial
         response is saved rather than lost.
         """
-        from pathlib import Path
-
-        from claude_agent_sdk import (
-            ClaudeSDKClient,
-            ClaudeAgentOptions,
-            AssistantMessage,
-            ResultMessage,
-            TextBlock,
-        )
-        from services.supabase_client import create_session, save_message
-        from services.embeddings import generate_embedding
-        from services.registry import load_registry
-        from agents.tools import registry_mcp_server, init_tools
-
         schedule_name = schedule["name"]
         prompt = schedule["prompt"]
         logger.info(f"[SCHEDULER] Executing: {schedule_name}")
@@ -347,35 +531,7 @@ class TaskScheduler:
                 agent_name="[Scheduler]",
             )
 
-            # Load Clyde's system prompt
-            prompt_path = os.path.join(self.working_dir, "prompts", "clyde-system.md")
-            with open(prompt_path, "r") as f:
-                system_prompt = f.read()
-
-            abs_working = str(Path(self.working_dir).resolve())
-            system_prompt += (
-                "\n\n## Working Directory\n\n"
-                f"Your working directory is: `{abs_working}`\n\n"
-                "All file operations (Read, Write, Edit, Glob, Grep) MUST use paths within "
-                "this directory.\n"
-            )
-
-            # Inject orchestrator skills into system prompt
-            try:
-                registry = load_registry(self.working_dir)
-                orchestrator = registry.get("orchestrator", {})
-                skill_names = orchestrator.get("skills", [])
-                if skill_names:
-                    skills_content = self._load_skills(skill_names)
-                    if skills_content:
-                        system_prompt += (
-                            "\n\n## Your Assigned Skills\n\n"
-                            "The following skills have been assigned to you. Follow these "
-                            "documented processes when relevant to your tasks.\n\n"
-                            f"{skills_content}"
-                        )
-            except Exception:
-                pass
+            system_prompt = self._compute_system_prompt()
 
             # Initialise MCP tools
             init_tools(self.working_dir)
@@ -384,30 +540,10 @@ class TaskScheduler:
             agents = self._build_agent_definitions()
             logger.info(f"[SCHEDULER] Agents from registry: {list(agents.keys()) if agents else 'none'}")
 
-            # Build allowed_tools list
-            from agents.clyde import _AUTO_ALLOW_TOOLS
-            bare_tools = list(_AUTO_ALLOW_TOOLS)
-            prefixed_tools = [f"mcp__registry_tools__{t}" for t in _AUTO_ALLOW_TOOLS]
-
-            # Collect tools declared on subagents so they're whitelisted at top level
-            subagent_tools: set[str] = set()
-            for agent_def in agents.values():
-                if agent_def.tools:
-                    subagent_tools.update(agent_def.tools)
-
             options = ClaudeAgentOptions(
                 model="claude-opus-4-6",
                 system_prompt=system_prompt,
-                allowed_tools=[
-                    "Read", "Edit", "Write", "Bash", "Glob", "Grep",
-                    "WebSearch", "WebFetch", "Task",
-                    *[t for t in subagent_tools if t not in {
-                        "Read", "Edit", "Write", "Bash", "Glob", "Grep",
-                        "WebSearch", "WebFetch", "Task",
-                    }],
-                    *bare_tools,
-                    *prefixed_tools,
-                ],
+                allowed_tools=self._allowed_tools(agents),
                 agents=agents if agents else None,
                 mcp_servers={"registry_tools": registry_mcp_server},
                 permission_mode="bypassPermissions",
@@ -528,11 +664,13 @@ class TaskScheduler:
             schedule["last_run"] = datetime.now(timezone.utc).isoformat()
             schedule["run_count"] = schedule.get("run_count", 0) + 1
 
-            # Auto-disable one-off schedules after they fire
+            # Auto-disable one-off schedules after they fire (a real config
+            # change, so written now); plain run bookkeeping is debounced
             if schedule.get("schedule_type") == "one_off":
                 schedule["enabled"] = False
-
-            self._save_schedules()
+                self._save_schedules()
+            else:
+                self._schedule_save()
 
             logger.info(
                 f"[SCHEDULER] Completed: {schedule_name} "
@@ -545,13 +683,11 @@ class TaskScheduler:
             # Even on hard failure, try to save partial response if we have one
             if full_response and session_id:
                 try:
-                    from services.supabase_client import save_message as _save_msg
-                    from services.embeddings import generate_embedding as _gen_emb
                     try:
-                        emb = await _gen_emb(full_response[:8000])
+                        emb = await generate_embedding(full_response[:8000])
                     except Exception:
                         emb = None
-                    await _save_msg(
+                    await save_message(
                         session_id=session_id,
                         role="clyde",
                         content=full_response + "\n\n---\n*Task execution failed. Response may be partial.*",
@@ -583,8 +719,13 @@ class TaskScheduler:
             f"[SCHEDULER] Started with {len(self._schedules)} schedule(s)"
         )
 
-    def stop(self) -> None:
-        """Shut down the scheduler."""
+    async def stop(self) -> None:
+        """Shut down the scheduler and flush any pending schedules.json write."""
         if self.scheduler.running:
             self.scheduler.shutdown(wait=False)
             logger.info("[SCHEDULER] Stopped")
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._flush_save()
+        if self._save_task is not None:
+            await self._save_task
@@ -10,7 +10,6 @@ protect user-created agents from being overwritten on pull.
 import json
 import os
 import tempfile
-import time
 from typing import Any
 
 # Default values for all settings — new settings added here are automatically
@@ -27,9 +26,18 @@ DEFAULTS: dict[str, Any] = {
     "prevent_sleep_enabled": False,
 }
 
-# In-memory cache (TTL-based, invalidated on save)
-_settings_cache: dict[str, tuple[float, dict[str, Any]]] = {}
-_CACHE_TTL = 5.0  # seconds
+# In-memory cache keyed on settings.json's (st_mtime_ns, st_size), so one
+# stat per call replaces a read + parse and external edits show up at once.
+# Invalidated on save.
+_settings_cache: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+
+
+def _file_sig(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
 
 def _settings_path(working_dir: str) -> str:
@@ -43,20 +51,18 @@ def load_settings(working_dir: str) -> dict[str, Any]:
     If settings.json doesn't exist yet, creates it with all defaults.
     """
     path = _settings_path(working_dir)
-    now = time.monotonic()
+    sig = _file_sig(path)
 
     # Check cache
     cached = _settings_cache.get(path)
-    if cached is not None:
-        cached_time, cached_data = cached
-        if now - cached_time < _CACHE_TTL:
-            return cached_data
+    if cached is not None and sig is not None and cached[0] == sig:
+        return cached[1]
 
     # Start from defaults
     merged = dict(DEFAULTS)
 
     # Overlay user file if it exists
-    if os.path.exists(path):
+    if sig is not None:
         try:
             with open(path, "r") as f:
                 user_data = json.load(f)
@@ -66,8 +72,10 @@ def load_settings(working_dir: str) -> dict[str, Any]:
     else:
         # First run — create the file with defaults
         _write_settings(path, merged)
+        sig = _file_sig(path)
 
-    _settings_cache[path] = (now, merged)
+    if sig is not None:
+        _settings_cache[path] = (sig, merged)
     return merged
 
 
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
@@ -17,6 +18,20 @@ def get_supabase() -> Client:
     return _client
 
 
+def warm_supabase() -> None:
+    """Create the shared client and open its pooled HTTPS connection now, so
+    the first chat turn's writes don't pay client setup plus a TLS handshake."""
+    get_supabase().table("chat_sessions").select("id").limit(1).execute()
+
+
+def close_supabase() -> None:
+    """Close the shared client's PostgREST connection pool."""
+    global _client
+    if _client is not None:
+        _client.postgrest.session.close()
+        _client = None
+
+
 # --- Chat Sessions ---
 
 
@@ -54,6 +69,17 @@ async def save_message(
     return result.data[0]
 
 
+async def update_message_embedding(message_id: str, embedding: list[float]) -> None:
+    """Backfill the embedding on an already-saved message."""
+    client = get_supabase()
+    (
+        client.table("chat_messages")
+        .update({"embedding": embedding})
+        .eq("id", message_id)
+        .execute()
+    )
+
+
 async def get_session_messages(session_id: str) -> list[dict]:
     client = get_supabase()
     result = (
@@ -80,7 +106,9 @@ async def search_messages(
     }
     if session_id:
         params["filter_session_id"] = session_id
-    result = client.rpc("match_chat_messages", params).execute()
+    # Vector search is the slowest query here; keep it off the event loop so
+    # concurrent searches overlap
+    result = await asyncio.to_thread(client.rpc("match_chat_messages", params).execute)
     return result.data
 
 
@@ -241,12 +269,13 @@ async def get_recently_active_agents(days: int = 30) -> set[str]:
     """Return the set of agent_name values that appear in activity_events within the last N days."""
     client = get_supabase()
     cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    result = (
+    query = (
         client.table("activity_events")
         .select("agent_name")
         .gte("created_at", cutoff)
-        .execute()
     )
+    # Off the event loop so the proactive analysis passes can overlap
+    result = await asyncio.to_thread(query.execute)
     return {row["agent_name"] for row in result.data if row.get("agent_name")}
 
 
@@ -352,9 +381,7 @@ async def get_cost_summary() -> dict:
     today_usd = 0.0
     week_usd = 0.0
     month_usd = 0.0
-    agent_costs: dict[str, dict] = defaultdict(
-        lambda: {"cost_usd": 0.0, "message_count": 0}
-    )
+    agent_costs: dict[str, dict] = {}
     daily_costs: dict[str, float] = defaultdict(float)
 
     for msg in messages:
@@ -384,8 +411,11 @@ async def get_cost_summary() -> dict:
             month_usd += cost
 
         # Per-agent
-        agent_costs[agent]["cost_usd"] += cost
-        agent_costs[agent]["message_count"] += 1
+        data = agent_costs.get(agent)
+        if data is None:
+            data = agent_costs[agent] = {"cost_usd": 0.0, "message_count": 0}
+        data["cost_usd"] += cost
+        data["message_count"] += 1
 
     # Build response
     by_agent = [
@@ -442,6 +472,15 @@ async def save_insight(
     return result.data[0] if result.data else {}
 
 
+async def save_insights_bulk(rows: list[dict]) -> list[dict]:
+    """Insert several proactive insights in one request."""
+    if not rows:
+        return []
+    client = get_supabase()
+    result = client.table("proactive_insights").insert(rows).execute()
+    return result.data or []
+
+
 async def get_pending_insights(limit: int = 20) -> list[dict]:
     """Get insights that are pending and not currently snoozed."""
     client = get_supabase()
@@ -478,6 +517,22 @@ async def get_all_insights(limit: int = 50) -> list[dict]:
     return result.data
 
 
+async def get_recent_insight_keys(
+    since_iso: str, types: list[str], limit: int = 200
+) -> list[dict]:
+    """Get the type and data of insights of the given types created since a timestamp."""
+    client = get_supabase()
+    result = (
+        client.table("proactive_insights")
+        .select("insight_type,data")
+        .gte("created_at", since_iso)
+        .in_("insight_type", types)
+        .limit(limit)
+        .execute()
+    )
+    return result.data
+
+
 async def update_insight_status(
     insight_id: str,
     status: str,
@@ -510,18 +565,19 @@ async def delete_insight(insight_id: str) -> bool:
 
 
 async def get_recent_message_contents(
-    days: int = 7, limit: int = 200
+    days: int = 7, limit: int = 200, columns: str = "content, session_id, created_at"
 ) -> list[dict]:
-    """Fetch recent user message contents for pattern analysis."""
+    """Fetch recent user message contents for pattern analysis, newest first."""
     client = get_supabase()
     cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    result = (
+    query = (
         client.table("chat_messages")
-        .select("content, session_id, created_at")
+        .select(columns)
         .eq("role", "user")
         .gte("created_at", cutoff)
         .order("created_at", desc=True)
         .limit(limit)
-        .execute()
     )
+    # Off the event loop so the proactive analysis passes can overlap
+    result = await asyncio.to_thread(query.execute)
     return result.data
@@ -58,51 +58,14 @@ export function ChatContainer() {
   const handleMessage = useCallback(
     (msg: WebSocketMessage) => {
       switch (msg.type) {
-        case "init": {
+        case "session_init_bundle": {
+          // One frame on connect: session id plus (when resuming) prior
+          // messages and persisted activity events
           const sid = msg.data.session_id as string | null;
           // For resumed sessions, set the ID immediately.
           // For new chats, session_id is null — deferred until first message.
           if (sid) setSessionId(sid);
-          setLoadingSession(false);
-          break;
-        }
 
-        case "session_created": {
-          // Backend created the session on first user message — set real ID + add to sidebar
-          const newSid = msg.data.session_id as string;
-          const title = (msg.data.title as string) || "New Chat";
-          const createdAt = (msg.data.created_at as string) || new Date().toISOString();
-          setSessionId(newSid);
-          addSession({
-            id: newSid,
-            title,
-            messageCount: 1,
-            lastMessagePreview: "",
-            totalCost: 0,
-            createdAt,
-            updatedAt: createdAt,
-          });
-          break;
-        }
-
-        case "background_session_created": {
-          // A scheduler or trigger created a session in the background — add to sidebar
-          const bgSid = msg.data.session_id as string;
-          const bgTitle = (msg.data.title as string) || "New Chat";
-          const bgCreatedAt = (msg.data.created_at as string) || new Date().toISOString();
-          addSession({
-            id: bgSid,
-            title: bgTitle,
-            messageCount: 1,
-            lastMessagePreview: "",
-            totalCost: 0,
-            createdAt: bgCreatedAt,
-            updatedAt: bgCreatedAt,
-          });
-          break;
-        }
-
-        case "session_history": {
           // Batch load prior messages when resuming a session
           const historyMessages = msg.data.messages as Array<{
             id: string;
@@ -133,13 +96,9 @@ export function ChatContainer() {
             });
             setMessages(formatted);
           }
-          setLoadingSession(false);
-          break;
-        }
 
-        case "activity_history": {
           // Hydrate activity feed from persisted Supabase data on session resume
-          const events = msg.data.events as Array<{
+          const events = msg.data.activity as Array<{
             id: string;
             agent_id: string;
             agent_name: string;
@@ -162,6 +121,42 @@ export function ChatContainer() {
             // Reverse so newest first (matches store convention)
             setActivityEvents(formatted.reverse());
           }
+          setLoadingSession(false);
+          break;
+        }
+
+        case "session_created": {
+          // Backend created the session on first user message — set real ID + add to sidebar
+          const newSid = msg.data.session_id as string;
+          const title = (msg.data.title as string) || "New Chat";
+          const createdAt = (msg.data.created_at as string) || new Date().toISOString();
+          setSessionId(newSid);
+          addSession({
+            id: newSid,
+            title,
+            messageCount: 1,
+            lastMessagePreview: "",
+            totalCost: 0,
+            createdAt,
+            updatedAt: createdAt,
+          });
+          break;
+        }
+
+        case "background_session_created": {
+          // A scheduler or trigger created a session in the background — add to sidebar
+          const bgSid = msg.data.session_id as string;
+          const bgTitle = (msg.data.title as string) || "New Chat";
+          const bgCreatedAt = (msg.data.created_at as string) || new Date().toISOString();
+          addSession({
+            id: bgSid,
+            title: bgTitle,
+            messageCount: 1,
+            lastMessagePreview: "",
+            totalCost: 0,
+            createdAt: bgCreatedAt,
+            updatedAt: bgCreatedAt,
+          });
           break;
         }
 
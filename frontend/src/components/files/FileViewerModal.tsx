@@ -10,6 +10,7 @@ const API_URL =
 
 type FileInfo = {
   content: string | null;
+  url?: string;
   path: string;
   name: string;
   size: number;
@@ -152,6 +153,8 @@ export function FileViewerModal({ filePath, fileName, onClose, onSaved }: FileVi
   const [mdMode, setMdMode] = useState<"preview" | "edit">("preview");
   const isImage = fileInfo?.mime_type.startsWith("image/") || false;
   const isPdf = fileInfo?.mime_type === "application/pdf";
+  // Images/PDFs are streamed from the backend via a preview URL
+  const previewSrc = fileInfo?.url ? `${API_URL}${fileInfo.url}` : fileInfo?.content;
   const isUnsupported = fileInfo && !fileInfo.editable && !isImage && !isPdf;
 
   return (
@@ -287,22 +290,22 @@ export function FileViewerModal({ filePath, fileName, onClose, onSaved }: FileVi
                 className="flex-1 w-full bg-bg-primary text-text-primary font-mono text-[13px] leading-relaxed p-4 resize-none focus:outline-none border-none placeholder:text-text-secondary/30 overflow-auto"
                 style={{ tabSize: 2 }}
               />
-            ) : isImage && fileInfo?.content ? (
+            ) : isImage && previewSrc ? (
               /* ── Image viewer ─────────────────────── */
               <div className="flex-1 flex items-center justify-center p-6 overflow-auto bg-bg-primary">
                 <img
-                  src={fileInfo.content}
-                  alt={fileInfo.name}
+                  src={previewSrc}
+                  alt={fileInfo?.name}
                   className="max-w-full max-h-full object-contain rounded-[2px]"
                   style={{ imageRendering: "auto" }}
                 />
               </div>
-            ) : isPdf && fileInfo?.content ? (
+            ) : isPdf && previewSrc ? (
               /* ── PDF viewer ───────────────────────── */
               <div className="flex-1 overflow-hidden bg-bg-primary">
                 <iframe
-                  src={fileInfo.content}
-                  title={fileInfo.name}
+                  src={previewSrc}
+                  title={fileInfo?.name}
                   className="w-full h-full border-none"
                 />
               </div>
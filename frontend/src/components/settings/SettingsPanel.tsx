@@ -243,7 +243,45 @@ function SystemTab() {
   async function handleExport() {
     try {
       const res = await fetch(`${API_URL}/api/system/export`);
-      const data = await res.json();
+      if (!res.ok || !res.body) throw new Error("Export failed");
+
+      // The backend streams NDJSON (one section or file per line) —
+      // reassemble it into the bundle shape that import expects
+      const data: Record<string, unknown> = {
+        registry: {},
+        schedules: {},
+        triggers: {},
+        prompts: {},
+        skills: {},
+        memory: {},
+      };
+      const applyLine = (line: string) => {
+        if (!line.trim()) return;
+        const { section, ...rest } = JSON.parse(line);
+        if (section === "error") {
+          // The backend hit a failure mid-stream; don't save a partial bundle
+          throw new Error(`Export of ${rest.failed_section} failed`);
+        } else if (section === "meta") {
+          Object.assign(data, rest);
+        } else if ("name" in rest) {
+          (data[section] as Record<string, string>)[rest.name] = rest.content;
+        } else {
+          data[section] = rest.data;
+        }
+      };
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value, { stream: !done });
+        const lines = buffered.split("\n");
+        buffered = lines.pop() ?? "";
+        lines.forEach(applyLine);
+        if (done) break;
+      }
+      applyLine(buffered);
+
       const blob = new Blob([JSON.stringify(data, null, 2)], {
         type: "application/json",
       });
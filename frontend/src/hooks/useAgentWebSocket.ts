@@ -9,17 +9,15 @@ export type WebSocketMessage = {
     | "tool_result"
     | "result"
     | "error"
-    | "init"
+    | "session_init_bundle"
     | "permission_request"
     | "permission_timeout"
     | "agent_activity"
     | "agent_notification"
     | "registry_update"
-    | "session_history"
     | "session_title_update"
     | "session_created"
     | "proactive_insight"
-    | "activity_history"
     | "cancel_confirmed";
   data: Record<string, unknown>;
 };